@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Calls served at once; the rest wait in a bounded queue, highest priority first
+MAX_CONCURRENT = int(os.getenv("MCP_MAX_CONCURRENT_CALLS", "32"))
+MAX_QUEUE = int(os.getenv("MCP_MAX_QUEUED_CALLS", "64"))
+QUEUE_TIMEOUT = float(os.getenv("MCP_QUEUE_TIMEOUT", "5"))
+
+# Token buckets: sustained calls per second and burst size; a rate of 0 disables the limit
+TOOL_RATE = float(os.getenv("MCP_TOOL_RATE", "50"))
+TOOL_BURST = float(os.getenv("MCP_TOOL_BURST", "100"))
+PATIENT_RATE = float(os.getenv("MCP_PATIENT_RATE", "10"))
+PATIENT_BURST = float(os.getenv("MCP_PATIENT_BURST", "30"))
+MAX_PATIENT_BUCKETS = int(os.getenv("MCP_MAX_PATIENT_BUCKETS", "10000"))
+
+# Lower runs first when calls have to queue
+PRIORITY_WRITE, PRIORITY_READ, PRIORITY_BULK = 0, 1, 2
+
+
+class Rejected(Exception):
+    """A call turned away by admission control; `reason` is "rate_limited" or "overloaded"."""
+
+    def __init__(self, reason: str, message: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Rate limits and a priority queue in front of every tool and resource call.
+
+    A call first takes a token from its tool's bucket and, if it names a
+    patient, from that patient's bucket; an empty bucket rejects it at once
+    with the time until the next token. It then takes one of max_concurrent
+    slots, or waits for one in a queue of at most max_queue calls ordered by
+    priority (writes before reads before bulk reads). When the queue is full a
+    new call displaces the lowest-priority waiter if it outranks it, otherwise
+    it is rejected; waiters that do not get a slot within queue_timeout are
+    rejected too. Used from the event loop only.
+    """
+
+    def __init__(self, priority: Callable[[str], int] = lambda name: PRIORITY_READ,
+                 max_concurrent: int = MAX_CONCURRENT, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT,
+                 tool_rate: float = TOOL_RATE, tool_burst: float = TOOL_BURST,
+                 patient_rate: float = PATIENT_RATE, patient_burst: float = PATIENT_BURST,
+                 tool_rates: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.priority = priority
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tool_rate, self.tool_burst = tool_rate, tool_burst
+        self.patient_rate, self.patient_burst = patient_rate, patient_burst
+        self.tool_rates = dict(tool_rates or {})  # tool -> (rate, burst) overriding the default
+        self._tool_buckets: Dict[str, TokenBucket] = {}
+        self._patient_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._active = 0
+        self._queue: List[list] = []  # heap of [priority, seq, future]
+        self._seq = itertools.count()
+        self._counts: Dict[Tuple[str, str], int] = {}  # (reason, priority class) -> shed calls
+        self.admitted = 0
+
+    def _shed(self, reason: str, priority: int):
+        key = (reason, ("write", "read", "bulk")[min(priority, PRIORITY_BULK)])
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _check_rates(self, name: str, patient_id) -> Optional[Rejected]:
+        rate, burst = self.tool_rates.get(name, (self.tool_rate, self.tool_burst))
+        if rate > 0:
+            bucket = self._tool_buckets.get(name)
+            if bucket is None:
+                bucket = self._tool_buckets[name] = TokenBucket(rate, burst)
+            wait = bucket.take()
+            if wait:
+                return Rejected("rate_limited", f"Tool {name} is over its rate limit of {rate:g}/s", wait)
+
+        if patient_id and self.patient_rate > 0:
+            patient_id = str(patient_id)
+            bucket = self._patient_buckets.get(patient_id)
+            if bucket is None:
+                bucket = self._patient_buckets[patient_id] = TokenBucket(self.patient_rate, self.patient_burst)
+                while len(self._patient_buckets) > MAX_PATIENT_BUCKETS:
+                    self._patient_buckets.popitem(last=False)
+            self._patient_buckets.move_to_end(patient_id)
+            wait = bucket.take()
+            if wait:
+                return Rejected("rate_limited", f"Too many calls for patient {patient_id}", wait)
+        return None
+
+    async def _acquire(self, priority: int):
+        if self._active < self.max_concurrent and not self._queue:
+            self._active += 1
+            return
+
+        if len(self._queue) >= self.max_queue:
+            worst = max(self._queue) if self._queue else None
+            if worst is None or worst[0] <= priority:
+                raise Rejected("overloaded", "Server is overloaded; try again shortly", self.queue_timeout)
+            # A higher-priority call takes the place of the lowest-priority waiter
+            self._remove(worst)
+            worst[2].set_exception(Rejected("overloaded", "Displaced by higher-priority work", self.queue_timeout))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._queue, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and future.exception() is None:
+                return  # the slot arrived right at the deadline
+            self._remove(entry)
+            raise Rejected("overloaded", f"No capacity within {self.queue_timeout:g}s; try again shortly",
+                           self.queue_timeout)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release()  # the slot was handed over just as the caller gave up
+            else:
+                self._remove(entry)
+            raise
+
+    def _remove(self, entry: list):
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+
+    def _release(self):
+        # Hand the slot straight to the best waiter so it cannot be taken by a newcomer
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def admit(self, name: str, patient_id=None):
+        """Hold a slot for the block; raises Rejected when rate limited or overloaded."""
+        priority = self.priority(name)
+        rejected = self._check_rates(name, patient_id)
+        if rejected is not None:
+            self._shed(rejected.reason, priority)
+            raise rejected
+        try:
+            await self._acquire(priority)
+        except Rejected as e:
+            self._shed(e.reason, priority)
+            raise
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    def clear(self):
+        """Refill every bucket and reset the shed counters; calls holding or awaiting slots are unaffected."""
+        self._tool_buckets.clear()
+        self._patient_buckets.clear()
+        self._counts.clear()
+        self.admitted = 0
+
+    def stats(self) -> Dict:
+        shed: Dict[str, Dict[str, int]] = {}
+        for (reason, priority), count in sorted(self._counts.items()):
+            shed.setdefault(reason, {})[priority] = count
+        return {
+            "active": self._active,
+            "queued": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": shed,
+            "patients_tracked": len(self._patient_buckets),
+        }
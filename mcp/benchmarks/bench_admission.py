@@ -0,0 +1,100 @@
+"""Admission control under overload: write latency behind a read flood, shedding, and rate limiting.
+
+A flood of single- and multi-patient reads is fired at the in-process server
+together with a few bookings, with a small concurrency limit and queue. It
+runs once with every call at the same priority and once with writes first.
+Then a looping agent calls one tool for one patient as fast as it can and
+gets rate limited.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_admission --reads 200 --writes 10 --max-concurrent 8 --max-queue 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+
+from benchmarks.stub_gateway import StubGateway
+
+
+async def timed_call(server, tool, arguments):
+    start = time.perf_counter()
+    result = await server.mcp.call_tool(tool, arguments)
+    body = json.loads(result[0].text)
+    return time.perf_counter() - start, body.get("reason", "ok")
+
+
+async def flood(server, reads: int, writes: int):
+    calls = []
+    for i in range(reads):
+        if i % 4 == 0:
+            calls.append(("bulk", "view_pending_items", {"patient_ids": [f"b{i}-{j}" for j in range(5)]}))
+        else:
+            calls.append(("read", "view_pending_lab_tests", {"patient_id": f"r{i}"}))
+    tasks = [asyncio.ensure_future(timed_call(server, tool, args)) for _, tool, args in calls]
+    await asyncio.sleep(0.01)  # bookings arrive once the queue has filled up
+    bookings = [
+        asyncio.ensure_future(timed_call(server, "book_appointment", {
+            "patient_id": f"w{i}", "doctor_id": "doc-1", "date": "2025-03-02", "time": "10:00"}))
+        for i in range(writes)
+    ]
+    results = await asyncio.gather(*tasks, *bookings)
+    classes = [c for c, _, _ in calls] + ["write"] * writes
+    return list(zip(classes, results))
+
+
+def summarize(label: str, outcomes):
+    print(label)
+    for cls in ("write", "read", "bulk"):
+        rows = [r for c, r in outcomes if c == cls]
+        served = sorted(t for t, reason in rows if reason == "ok")
+        shed = [t for t, reason in rows if reason != "ok"]
+        line = f"    {cls:<6} served {len(served):>4}  shed {len(shed):>4}"
+        if served:
+            line += f"  p50 {statistics.median(served) * 1000:7.1f} ms  max {served[-1] * 1000:7.1f} ms"
+        if shed:
+            line += f"  rejected in p50 {statistics.median(shed) * 1000:.1f} ms"
+        print(line)
+
+
+async def looping_agent(server, calls: int):
+    outcomes = [await timed_call(server, "view_pending_lab_tests", {"patient_id": "loop"}) for _ in range(calls)]
+    limited = [t for t, reason in outcomes if reason == "rate_limited"]
+    print(f"looping agent: {calls} calls, {calls - len(limited)} served, {len(limited)} rate limited "
+          f"(rejected in p50 {statistics.median(limited) * 1e6 if limited else 0:.0f} us)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=10)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="latency added by the stub gateway")
+    args = parser.parse_args()
+
+    os.environ["MCP_TRACE_FILE"] = ""
+    os.environ["MCP_PREFETCH"] = "0"  # only the calls themselves reach the gateway
+    with StubGateway(latency=args.latency_ms / 1000) as stub:
+        os.environ["API_GATEWAY_URL"] = stub.base_url  # read when mcp_server is imported
+        import mcp_server
+        from admission import PRIORITY_READ, AdmissionController
+
+        logging.getLogger().setLevel(logging.WARNING)
+        limits = {"max_concurrent": args.max_concurrent, "max_queue": args.max_queue, "tool_rate": 0}
+        for label, priority in (("same priority", lambda name: PRIORITY_READ),
+                                ("writes first", mcp_server.admission.priority)):
+            mcp_server.admission = AdmissionController(priority=priority, **limits)
+            summarize(label, asyncio.run(flood(mcp_server, args.reads, args.writes)))
+            print(f"    {mcp_server.admission.stats()}")
+
+        mcp_server.admission = AdmissionController(priority=mcp_server.admission.priority)
+        asyncio.run(looping_agent(mcp_server, 100))
+        print(f"    {mcp_server.admission.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Fire N parallel call_tool requests at the MCP server backed by a slow stub gateway.
+
+Each call is for a different patient and prefetch is off, so no call can be
+coalesced with another or served from a snapshot: every call makes its own
+gateway request and the overlap measures concurrency alone.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_concurrent_tools --calls 64 --latency-ms 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from benchmarks.bench_transport import UNLIMITED
+from benchmarks.stub_gateway import StubGateway
+
+
+async def fire(server, calls, tool, patient_prefix):
+    start = time.perf_counter()
+    await asyncio.gather(*(server.call_tool(tool, {"patient_id": f"{patient_prefix}-{i}"}) for i in range(calls)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="latency added by the stub gateway")
+    parser.add_argument("--tool", default="view_pending_lab_tests")
+    parser.add_argument("--patient-prefix", default="p", help="call i is for patient <prefix>-<i>")
+    args = parser.parse_args()
+
+    with StubGateway(latency=args.latency_ms / 1000) as stub:
+        # mcp_server reads the gateway URL and admission limits at import time
+        os.environ["API_GATEWAY_URL"] = stub.base_url
+        os.environ.update(UNLIMITED)
+        os.environ["MCP_PREFETCH"] = "0"
+        import mcp_server
+
+        logging.getLogger().setLevel(logging.WARNING)
+        elapsed = asyncio.run(fire(mcp_server.mcp, args.calls, args.tool, args.patient_prefix))
+
+        # One gateway round trip after another for every request actually made
+        serial = stub.requests * args.latency_ms / 1000
+        print(
+            f"{args.calls} parallel {args.tool} calls in {elapsed:.3f}s  "
+            f"throughput={args.calls / elapsed:.1f} calls/s  "
+            f"(serial lower bound {serial:.3f}s, overlap x{serial / elapsed:.1f})"
+        )
+        print(f"gateway requests={stub.requests} tcp_connections={stub.connections}")
+        print(f"pool stats: {mcp_server.gateway.pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
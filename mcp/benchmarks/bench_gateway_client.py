@@ -0,0 +1,69 @@
+"""Per-call requests.get vs the pooled GatewayClient against a local stub gateway.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_gateway_client --calls 500 --concurrency 8
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stub_gateway import StubGateway
+from gateway_client import GatewayClient
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run(label, call, calls, concurrency, stub):
+    connections_before = stub.connections
+
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(calls)))
+    wall = time.perf_counter() - wall_start
+
+    print(
+        f"{label:<12} p50={percentile(samples, 50) * 1000:7.2f}ms  "
+        f"p99={percentile(samples, 99) * 1000:7.2f}ms  "
+        f"mean={statistics.mean(samples) * 1000:7.2f}ms  "
+        f"throughput={calls / wall:8.1f} req/s  "
+        f"tcp_connections={stub.connections - connections_before}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latency added by the stub gateway")
+    args = parser.parse_args()
+
+    with StubGateway(latency=args.latency_ms / 1000) as stub:
+        url = f"{stub.base_url}/booked-lab-tests/patient/p1"
+        run("per-call", lambda: requests.get(url), args.calls, args.concurrency, stub)
+
+        gateway = GatewayClient(stub.base_url, pool_maxsize=max(args.concurrency, 1))
+        run(
+            "pooled",
+            lambda: gateway.get("/booked-lab-tests/patient/{patient_id}", {"patient_id": "p1"}),
+            args.calls,
+            args.concurrency,
+            stub,
+        )
+        print(f"pool stats: {gateway.pool_stats()}")
+        gateway.close()
+
+
+if __name__ == "__main__":
+    main()
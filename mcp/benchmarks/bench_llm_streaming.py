@@ -0,0 +1,101 @@
+"""Time-to-first-token and total latency of MCPClient turns against a local fake LLM.
+
+Also reports the worst event-loop stall seen while a turn is in flight, next to the
+old blocking, non-streamed Groq call as a baseline. Run from the mcp/ directory:
+    python -m benchmarks.bench_llm_streaming --turns 5 --words 60
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+
+from benchmarks.fake_llm import FakeLLM
+
+
+async def max_loop_stall(coro, interval=0.005):
+    """Run `coro` while a heartbeat measures the longest gap between ticks."""
+    worst = 0.0
+    done = False
+
+    async def heartbeat():
+        nonlocal worst
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            worst = max(worst, now - last - interval)
+            last = now
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    try:
+        await coro
+    finally:
+        done = True
+        await beat
+    return worst
+
+
+async def bench_streaming(base_url, turns):
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    from groq import AsyncGroq
+    from mcp_client import MCPClient
+
+    client = MCPClient()
+    client.groq = AsyncGroq(base_url=base_url, api_key="fake")
+    client.tools = [{"type": "function", "function": {"name": "noop", "description": "", "parameters": {"type": "object", "properties": {}}}}]
+
+    ttfts, totals, stalls = [], [], []
+    for i in range(turns):
+        with contextlib.redirect_stdout(io.StringIO()):
+            stalls.append(await max_loop_stall(client.process_query(f"question {i}")))
+        ttfts.append(client.last_timings["ttft"])
+        totals.append(client.last_timings["total"])
+    await client.groq.close()
+    return ttfts, totals, stalls
+
+
+async def bench_blocking(base_url, turns):
+    from groq import Groq
+
+    groq = Groq(base_url=base_url, api_key="fake")
+    totals, stalls = [], []
+
+    async def turn():
+        start = time.perf_counter()
+        groq.chat.completions.create(model="fake", messages=[{"role": "user", "content": "question"}])
+        totals.append(time.perf_counter() - start)
+
+    for _ in range(turns):
+        stalls.append(await max_loop_stall(turn()))
+    return totals, stalls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--words", type=int, default=60, help="words in each scripted reply")
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--token-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    reply = {"content": " ".join(f"word{i}" for i in range(args.words))}
+    with FakeLLM(script=[reply], first_token_delay=args.first_token_ms / 1000, token_delay=args.token_ms / 1000) as fake:
+        ttfts, totals, stalls = asyncio.run(bench_streaming(fake.base_url, args.turns))
+        print(
+            f"streamed  ttft={statistics.median(ttfts) * 1000:7.1f}ms  total={statistics.median(totals) * 1000:7.1f}ms  "
+            f"max loop stall={max(stalls) * 1000:7.1f}ms"
+        )
+
+        totals, stalls = asyncio.run(bench_blocking(fake.base_url, args.turns))
+        print(
+            f"blocking  ttft={statistics.median(totals) * 1000:7.1f}ms  total={statistics.median(totals) * 1000:7.1f}ms  "
+            f"max loop stall={max(stalls) * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
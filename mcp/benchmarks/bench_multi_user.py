@@ -0,0 +1,91 @@
+"""Drive many concurrent chats from one MCPClient against a local HTTP MCP server.
+
+Every user runs a few turns; each turn asks the fake LLM, calls a tool over
+the shared session pool and streams a follow-up reply.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_multi_user --users 200 --turns 3 --pool-size 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_transport import SERVER_SCRIPT, free_port, server_env, wait_until_listening
+from benchmarks.fake_llm import FakeLLM
+from benchmarks.stub_gateway import StubGateway
+
+
+async def chat(client, user_id, turns, latencies):
+    for i in range(turns):
+        start = time.perf_counter()
+        await client.process_query(f"show pending lab tests ({i})", user_id=user_id)
+        latencies.append(time.perf_counter() - start)
+
+
+async def drive(url, llm_url, users, turns, pool_size):
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ["MCP_TRACE_FILE"] = ""
+    from groq import AsyncGroq
+    from mcp_client import MCPClient
+
+    client = MCPClient(pool_size=pool_size, echo=False)
+    client.groq = AsyncGroq(base_url=llm_url, api_key="fake")
+    connect_start = time.perf_counter()
+    await client.connect_to_server(url)
+    connect = time.perf_counter() - connect_start
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(chat(client, f"user-{n}", turns, latencies) for n in range(users)))
+    elapsed = time.perf_counter() - start
+    stats = client.pool.stats()
+    conversations = len(client.conversations)
+    await client.cleanup()
+    return connect, elapsed, sorted(latencies), stats, conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the HTTP server")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="latency added by the stub gateway")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    script = [{"tool_calls": [{"name": "view_pending_lab_tests", "arguments": {"patient_id": "p1"}}]}]
+    with StubGateway(latency=args.latency_ms / 1000) as stub, \
+            FakeLLM(script=script, first_token_delay=0.05, token_delay=0.002) as llm:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "--transport", "streamable-http", "--workers", str(args.workers)],
+            env=server_env(stub.base_url, MCP_HOST="127.0.0.1", MCP_PORT=str(port)),
+            cwd=os.path.dirname(SERVER_SCRIPT), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_listening(f"http://127.0.0.1:{port}/metrics")
+            connect, elapsed, latencies, stats, conversations = asyncio.run(
+                drive(f"http://127.0.0.1:{port}/mcp", llm.base_url, args.users, args.turns, args.pool_size))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{args.users} users x {args.turns} turns over {stats['sessions']} MCP sessions (connect {connect * 1000:.0f} ms)")
+    print(
+        f"{len(latencies) / elapsed:.1f} turns/s  p50={statistics.median(latencies) * 1000:.1f} ms  "
+        f"p99={p99 * 1000:.1f} ms  conversations={conversations}"
+    )
+    print(f"tool calls per session: {stats['calls']}  llm requests={llm.requests}")
+    print(f"client peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Bytes and serialization time of tool results per encoder, and the client's handling of them.
+
+Each tool runs once against the stub gateway; its result is then encoded
+the way FastMCP does by default (indented pydantic JSON), as compact JSON
+with each backend (orjson only if installed), and through the size cap.
+The client column is the time conversation.compact_tool_output spends on
+the indented vs. the compact text.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_output_encoding --repeat 200
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import pydantic_core
+
+from benchmarks.stub_gateway import StubGateway
+
+CALLS = [
+    ("view_pending_appointments", {"patient_id": "p1", "limit": 100}),
+    ("view_pending_lab_tests", {"patient_id": "p1"}),
+    ("view_all_prescriptions", {"patient_id": "p1"}),
+    ("list_doctors_and_nutritionists", {}),
+    ("question_from_medical_records", {"patient_id": "p1", "question": "routine checkup"}),
+    ("view_pending_items", {"patient_ids": [f"p{i}" for i in range(20)]}),
+]
+
+
+def per_call_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def raw_results(server):
+    results = []
+    for name, arguments in CALLS:
+        tool = server.mcp._tool_manager.get_tool(name)
+        results.append((name, await tool.run(arguments)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--max-bytes", type=int, default=6000)
+    args = parser.parse_args()
+
+    os.environ["MCP_TRACE_FILE"] = ""
+    with StubGateway() as stub:
+        os.environ["API_GATEWAY_URL"] = stub.base_url  # read when mcp_server is imported
+        import mcp_server
+        from conversation import compact_tool_output
+        from output_encoder import OutputEncoder, orjson
+
+        logging.getLogger().setLevel(logging.WARNING)
+        results = asyncio.run(raw_results(mcp_server))
+
+    encoders = {backend: OutputEncoder(backend=backend, indent=0) for backend in ("json", "pydantic")}
+    if orjson is not None:
+        encoders["orjson"] = OutputEncoder(backend="orjson", indent=0)
+    capping = OutputEncoder()
+
+    header = f"{'tool':<32} {'fastmcp B':>10} {'us':>6}"
+    for backend in encoders:
+        header += f" {backend + ' B':>9} {'us':>6}"
+    print(header + f" {'capped B':>9} {'client us (indented/compact)':>29}")
+
+    totals = {"fastmcp": 0, **{backend: 0 for backend in encoders}, "capped": 0}
+    for name, result in results:
+        indented = pydantic_core.to_json(result, fallback=str, indent=2).decode()
+        row = f"{name:<32} {len(indented):>10} {per_call_us(lambda: pydantic_core.to_json(result, fallback=str, indent=2).decode(), args.repeat):>6.0f}"
+        totals["fastmcp"] += len(indented)
+        for backend, encoder in encoders.items():
+            text = encoder.dumps(result)
+            totals[backend] += len(text)
+            row += f" {len(text):>9} {per_call_us(lambda: encoder.dumps(result), args.repeat):>6.0f}"
+        capped, _ = capping.encode(result, args.max_bytes)
+        totals["capped"] += len(capped)
+        compact = encoders["json"].dumps(result)
+        client = (per_call_us(lambda: compact_tool_output(indented, 1500), args.repeat),
+                  per_call_us(lambda: compact_tool_output(compact, 1500), args.repeat))
+        print(row + f" {len(capped):>9} {client[0]:>14.0f} / {client[1]:<12.0f}")
+
+    print("total bytes: " + ", ".join(f"{k} {v}" for k, v in totals.items()))
+
+
+if __name__ == "__main__":
+    main()
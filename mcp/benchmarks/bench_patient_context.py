@@ -0,0 +1,105 @@
+"""Patient working-set prefetch and incremental snapshot refresh.
+
+A session asks for a patient's pending appointments, lab tests, prescriptions
+and today's medicines one after another, with LLM think time in between. With
+prefetch the first call loads all four in parallel and the rest are served
+from the snapshot. Afterwards the snapshots expire and are revalidated: once
+with nothing changed (304s) and once after one lab test per patient changed.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_patient_context --patients 20 --think-ms 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+from benchmarks.stub_gateway import StubGateway
+
+TURN = [
+    "view_pending_appointments",
+    "view_pending_lab_tests",
+    "view_all_prescriptions",
+    "todays_medicine",
+]
+
+
+def response_bytes() -> float:
+    from metrics import GATEWAY_RESPONSE_BYTES
+
+    return sum(series["value"] for series in GATEWAY_RESPONSE_BYTES.snapshot())
+
+
+async def session(mcp, patient_id: str, think: float) -> float:
+    """Tool time of one session's four reads (think time excluded)."""
+    spent = 0.0
+    for tool in TURN:
+        start = time.perf_counter()
+        await mcp.call_tool(tool, {"patient_id": patient_id})
+        spent += time.perf_counter() - start
+        await asyncio.sleep(think)
+    return spent
+
+
+async def run_sessions(server, patients, think: float):
+    return await asyncio.gather(*(session(server.mcp, p, think) for p in patients))
+
+
+async def revalidate(server, patients):
+    server.patient_context.mark_stale("labtests")
+    start = time.perf_counter()
+    await asyncio.gather(*(server.mcp.call_tool("view_pending_lab_tests", {"patient_id": p}) for p in patients))
+    return time.perf_counter() - start
+
+
+def report(label: str, stub: StubGateway, requests_before: int, times):
+    times = sorted(times)
+    print(f"{label:<22} per session median {statistics.median(times) * 1000:7.1f} ms  "
+          f"max {times[-1] * 1000:7.1f} ms  gateway requests {stub.requests - requests_before}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=20)
+    parser.add_argument("--think-ms", type=float, default=50.0, help="LLM time between tool calls")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="latency added by the stub gateway")
+    args = parser.parse_args()
+    think = args.think_ms / 1000
+
+    os.environ["MCP_TRACE_FILE"] = ""
+    with StubGateway(latency=args.latency_ms / 1000) as stub:
+        os.environ["API_GATEWAY_URL"] = stub.base_url  # read when mcp_server is imported
+        import mcp_server
+
+        logging.getLogger().setLevel(logging.WARNING)
+        context = mcp_server.patient_context
+
+        for prefetch in (False, True):
+            context.clear()
+            context.prefetch_enabled = prefetch
+            patients = [f"{'pf' if prefetch else 'od'}-{i}" for i in range(args.patients)]
+            before = stub.requests
+            times = asyncio.run(run_sessions(mcp_server, patients, think))
+            report("prefetch" if prefetch else "on demand", stub, before, times)
+
+        before, bytes_before = stub.requests, response_bytes()
+        elapsed = asyncio.run(revalidate(mcp_server, patients))
+        print(f"revalidate, unchanged  {elapsed * 1000:7.1f} ms  gateway requests {stub.requests - before}  "
+              f"304s {stub.not_modified}  response bytes {response_bytes() - bytes_before:.0f}")
+
+        for p in patients:
+            stub.updates[f"lab-{p}-0"] = {"status": "COMPLETED", "updatedAt": "2025-02-01T00:00:00Z"}
+        counts = dict(context.stats())
+        before, bytes_before = stub.requests, response_bytes()
+        elapsed = asyncio.run(revalidate(mcp_server, patients))
+        stats = context.stats()
+        print(f"revalidate, 1 changed  {elapsed * 1000:7.1f} ms  gateway requests {stub.requests - before}  "
+              f"response bytes {response_bytes() - bytes_before:.0f}  items changed "
+              f"{stats['items_changed'] - counts['items_changed']} reused {stats['items_reused'] - counts['items_reused']}")
+        print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Import-time breakdown and time-to-first-tool-call for each way of reaching the server.
+
+Modes: a fresh stdio process per session, the pre-forked warm pool
+(warm_pool.py over a Unix socket) and an already running HTTP server.
+The stub gateway listens on the default gateway port (4000) when it is free,
+because stdio servers are spawned without the caller's environment.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_startup --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+
+from benchmarks.bench_transport import SERVER_SCRIPT, free_port, server_env, wait_until_listening
+from benchmarks.stub_gateway import StubGateway
+
+MCP_DIR = os.path.dirname(SERVER_SCRIPT)
+
+
+def import_breakdown(module: str, top: int):
+    """Run `python -X importtime -c "import module"` and print the costliest top-level imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=MCP_DIR, capture_output=True, text=True, env={**os.environ, "MCP_TRACE_FILE": ""},
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, int(cumulative_us), name.strip()))
+    total = next((cum for depth, cum, name in rows if name == module), 0)
+    children = sorted((r for r in rows if r[0] == 1 and r[2] != module), key=lambda r: -r[1])
+    print(f"import {module}: {total / 1000:.0f} ms")
+    for _, cumulative, name in children[:top]:
+        print(f"    {name:<32} {cumulative / 1000:7.1f} ms")
+
+
+async def first_tool_call(server: str, tool: str, arguments: dict) -> float:
+    from session_pool import open_session
+
+    start = time.perf_counter()
+    async with AsyncExitStack() as stack:
+        session, _ = await open_session(stack, server)
+        await session.call_tool(tool, arguments)
+        return time.perf_counter() - start
+
+
+def measure(label: str, server: str, rounds: int, tool: str, arguments: dict):
+    times = sorted(asyncio.run(first_tool_call(server, tool, arguments)) for _ in range(rounds))
+    print(f"{label:<34} median {statistics.median(times) * 1000:7.1f} ms  max {times[-1] * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="imports listed per module")
+    parser.add_argument("--warm-size", type=int, default=2)
+    parser.add_argument("--tool", default="list_doctors_and_nutritionists")
+    args = parser.parse_args()
+
+    for module in ("mcp_server", "mcp_client"):
+        import_breakdown(module, args.top)
+    print()
+
+    try:
+        stub = StubGateway(port=4000)
+    except OSError:
+        print("Port 4000 is taken; stdio servers will not reach the stub gateway")
+        stub = StubGateway()
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="warm-"), "mcp.sock")
+    http_port = free_port()
+    env = server_env(stub.base_url, MCP_HOST="127.0.0.1", MCP_PORT=str(http_port))
+    quiet = {"cwd": MCP_DIR, "env": env, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+
+    with stub:
+        warm = subprocess.Popen([sys.executable, "warm_pool.py", "--size", str(args.warm_size), "--socket", socket_path], **quiet)
+        http = subprocess.Popen([sys.executable, "mcp_server.py", "--transport", "streamable-http"], **quiet)
+        try:
+            wait_until_listening(f"http://127.0.0.1:{http_port}/metrics")
+            deadline = time.monotonic() + 30
+            while not os.path.exists(socket_path) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.5)  # let the first children reach accept()
+
+            measure("stdio, process per session", SERVER_SCRIPT, args.rounds, args.tool, {})
+            measure(f"warm pool ({args.warm_size} pre-forked)", f"unix://{socket_path}", args.rounds, args.tool, {})
+            measure("streamable-http, running server", f"http://127.0.0.1:{http_port}/mcp", args.rounds, args.tool, {})
+        finally:
+            for process in (warm, http):
+                process.terminate()
+                process.wait(timeout=10)
+        print(f"gateway requests={stub.requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Tool schema bytes per prompt with relevance-based subsetting, and connect time with a cached catalog.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_tool_catalog --top-k 0 3 5 8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_transport import SERVER_SCRIPT, free_port, server_env, wait_until_listening
+from benchmarks.stub_gateway import StubGateway
+
+# (query, tool the model is expected to call)
+QUERIES = [
+    ("Book an appointment with doctor doc-3 on 2025-03-02 at 10:00 for patient p1", "book_appointment"),
+    ("Please reschedule my appointment apt-7 to next Friday", "reschedule_appointment"),
+    ("Cancel appointment apt-2", "cancel_appointment"),
+    ("What did my last blood report say about cholesterol? patient p1", "question_from_medical_records"),
+    ("Show all my prescriptions, patient p4", "view_all_prescriptions"),
+    ("Book a lab test test-2 for patient p1", "book_lab_test"),
+    ("Cancel my lab test lab-9", "cancel_lab_test"),
+    ("Which doctors and nutritionists are available?", "list_doctors_and_nutritionists"),
+    ("Do I have any pending appointments? I'm p2", "view_pending_appointments"),
+    ("List my pending lab tests, patient p3", "view_pending_lab_tests"),
+    ("Which medicines do I take today? patient p1", "todays_medicine"),
+    ("Cancel appointments apt-1, apt-2 and apt-3", "batch_cancel_appointments"),
+    ("Show pending items for patients p1, p2 and p3", "view_pending_items"),
+]
+
+
+async def groq_tools():
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    import mcp_server
+    from mcp_client import MCPClient
+
+    return MCPClient(echo=False).convert_to_groq_tools(await mcp_server.mcp.list_tools())
+
+
+def subsetting(tools, top_ks):
+    from tool_catalog import ToolSelector
+
+    full = len(json.dumps(tools, separators=(",", ":")))
+    print(f"{len(tools)} tools, {full} bytes of schemas per prompt without subsetting")
+    for top_k in top_ks:
+        selector = ToolSelector(tools, top_k=top_k)
+        hits = 0
+        for query, expected in QUERIES:
+            chosen = {t["function"]["name"] for t in selector.select(query)}
+            hits += expected in chosen
+        stats = selector.stats()
+        avg = stats["bytes_sent"] / len(QUERIES)
+        print(
+            f"top_k={top_k:<3} avg {avg:7.0f} bytes/prompt  saved {100 * stats['bytes_saved'] / selector.bytes_full:5.1f}%  "
+            f"expected tool offered {hits}/{len(QUERIES)}"
+        )
+
+
+async def connect_times(url, rounds):
+    from mcp_client import MCPClient
+
+    times = []
+    for _ in range(rounds):
+        client = MCPClient(echo=False)
+        start = time.perf_counter()
+        await client.connect_to_server(url)
+        times.append(time.perf_counter() - start)
+        await client.cleanup()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[0, 3, 5, 8])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    catalog_dir = tempfile.mkdtemp(prefix="catalog-")
+    os.environ["MCP_CATALOG_DIR"] = catalog_dir  # read when tool_catalog is first imported
+    os.environ["MCP_TRACE_FILE"] = ""
+
+    with StubGateway() as stub:
+        os.environ["API_GATEWAY_URL"] = stub.base_url
+        tools = asyncio.run(groq_tools())
+        logging.getLogger().setLevel(logging.WARNING)
+        subsetting(tools, args.top_k)
+
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "--transport", "streamable-http"],
+            env=server_env(stub.base_url, MCP_HOST="127.0.0.1", MCP_PORT=str(port)),
+            cwd=os.path.dirname(SERVER_SCRIPT), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_listening(f"http://127.0.0.1:{port}/metrics")
+            times = asyncio.run(connect_times(f"http://127.0.0.1:{port}/mcp", args.rounds))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    warm = sorted(times[1:])
+    print(f"connect with discovery: {times[0] * 1000:.1f} ms; with cached catalog: "
+          f"median {warm[len(warm) // 2] * 1000:.1f} ms over {len(warm)} reconnects")
+
+
+if __name__ == "__main__":
+    main()
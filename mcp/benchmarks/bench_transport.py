@@ -0,0 +1,122 @@
+"""Sessions per second: a stdio server process per session vs one long-running HTTP server.
+
+Each session connects, initializes, calls one tool and disconnects; the
+gateway is a local stub so the numbers show transport and startup cost.
+
+Run from the mcp/ directory:
+    python -m benchmarks.bench_transport --sessions 40 --concurrency 8 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamable_http_client
+
+from benchmarks.stub_gateway import StubGateway
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp_server.py")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Load benchmarks measure throughput; admission control would shed their bursts
+UNLIMITED = {"MCP_TOOL_RATE": "0", "MCP_PATIENT_RATE": "0", "MCP_MAX_QUEUED_CALLS": "100000"}
+
+
+def server_env(gateway_url: str, **extra) -> dict:
+    # No metrics listener or trace file per spawned process
+    return {**os.environ, "API_GATEWAY_URL": gateway_url, "MCP_METRICS_PORT": "0", "MCP_TRACE_FILE": "",
+            **UNLIMITED, **extra}
+
+
+async def run_session(streams_cm, tool, arguments):
+    start = time.perf_counter()
+    async with streams_cm as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            await session.call_tool(tool, arguments)
+    return time.perf_counter() - start
+
+
+async def run_sessions(make_streams, sessions, concurrency, tool, arguments):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await run_session(make_streams(), tool, arguments)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(sessions)))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def wait_until_listening(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout}s")
+
+
+def report(label, elapsed, latencies):
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<28} {len(latencies) / elapsed:7.1f} sessions/s  "
+        f"p50={statistics.median(latencies) * 1000:7.1f} ms  p99={p99 * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the HTTP server")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="latency added by the stub gateway")
+    parser.add_argument("--tool", default="view_pending_lab_tests")
+    parser.add_argument("--patient-id", default="p1")
+    parser.add_argument("--skip-stdio", action="store_true")
+    args = parser.parse_args()
+    arguments = {"patient_id": args.patient_id}
+
+    with StubGateway(latency=args.latency_ms / 1000) as stub, open(os.devnull, "w") as devnull:
+        if not args.skip_stdio:
+            params = StdioServerParameters(command=sys.executable, args=[SERVER_SCRIPT], env=server_env(stub.base_url))
+            elapsed, latencies = asyncio.run(run_sessions(
+                lambda: stdio_client(params, errlog=devnull), args.sessions, args.concurrency, args.tool, arguments))
+            report("stdio (process per session)", elapsed, latencies)
+
+        port = free_port()
+        env = server_env(stub.base_url, MCP_HOST="127.0.0.1", MCP_PORT=str(port))
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "--transport", "streamable-http", "--workers", str(args.workers)],
+            env=env, cwd=os.path.dirname(SERVER_SCRIPT), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_listening(f"http://127.0.0.1:{port}/metrics")
+            url = f"http://127.0.0.1:{port}/mcp"
+            elapsed, latencies = asyncio.run(run_sessions(
+                lambda: streamable_http_client(url), args.sessions, args.concurrency, args.tool, arguments))
+            report(f"streamable-http x{args.workers} worker(s)", elapsed, latencies)
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+        print(f"gateway requests={stub.requests} tcp_connections={stub.connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+def default_responder(script: List[Dict]):
+    """Reply with the next scripted message, or a short summary right after tool results."""
+    replies = itertools.cycle(script or [{"content": "Hello from the fake LLM."}])
+
+    def respond(body: Dict) -> Dict:
+        messages = body.get("messages") or []
+        if messages and messages[-1].get("role") in ("function", "tool"):
+            return {"content": "Here is what I found."}
+        return next(replies)
+
+    return respond
+
+
+class FakeLLM:
+    """Local OpenAI/Groq-compatible chat completions endpoint with scripted replies.
+
+    A reply is {"content": "..."} or {"tool_calls": [{"name": ..., "arguments": {...}}]}.
+    Content is streamed word by word with a configurable time-to-first-token and
+    inter-token delay. Point the client at it with AsyncGroq(base_url=fake.base_url).
+    """
+
+    def __init__(self, script: Optional[List[Dict]] = None, responder: Optional[Callable[[Dict], Dict]] = None,
+                 first_token_delay: float = 0.2, token_delay: float = 0.01,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.respond = responder or default_responder(script or [])
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.requests = 0
+        self.request_bytes: List[int] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _chunks(self, reply: Dict):
+        if reply.get("tool_calls"):
+            yield {
+                "role": "assistant",
+                "tool_calls": [
+                    {
+                        "index": i,
+                        "id": f"call_{i}",
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+                    }
+                    for i, call in enumerate(reply["tool_calls"])
+                ],
+            }
+            return
+        words = reply.get("content", "").split(" ")
+        for i, word in enumerate(words):
+            yield {"role": "assistant", "content": word if i == 0 else f" {word}"}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                body = json.loads(raw or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                    fake.request_bytes.append(len(raw))
+                reply = fake.respond(body)
+                base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+
+                time.sleep(fake.first_token_delay)
+                if not body.get("stream"):
+                    deltas = list(fake._chunks(reply))
+                    time.sleep(fake.token_delay * max(len(deltas) - 1, 0))
+                    message = {"role": "assistant", "content": "".join(d.get("content", "") for d in deltas) or None}
+                    if reply.get("tool_calls"):
+                        message["tool_calls"] = [
+                            {k: v for k, v in call.items() if k != "index"} for call in deltas[0]["tool_calls"]
+                        ]
+                    data = json.dumps({
+                        **base,
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                    }).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, delta in enumerate(fake._chunks(reply)):
+                    if i:
+                        time.sleep(fake.token_delay)
+                    chunk = {**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                    self._send_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                done = {**base, "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                self._send_chunk(f"data: {json.dumps(done)}\n\n".encode())
+                self._send_chunk(b"data: [DONE]\n\n")
+                self._send_chunk(b"")
+
+        return Handler
+
+    def start(self) -> "FakeLLM":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
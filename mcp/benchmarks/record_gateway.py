@@ -0,0 +1,93 @@
+"""Record API gateway responses for replay by StubGateway(recording=...).
+
+Point the MCP server at the proxy (API_GATEWAY_URL=http://127.0.0.1:4100),
+use it against a real gateway, then stop the proxy with Ctrl+C:
+    python -m benchmarks.record_gateway --upstream http://localhost:4000 --out benchmarks/recordings/mine.json
+
+Only the last response per method/path/query is kept. Recordings hold real
+patient data; scrub them before committing.
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import urlparse
+
+import requests
+
+from benchmarks.stub_gateway import recording_key
+
+
+class RecordingProxy:
+    def __init__(self, upstream: str, host: str = "127.0.0.1", port: int = 4100):
+        self.upstream = upstream.rstrip("/")
+        self.exchanges: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    def _handler_class(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                headers = {k: v for k, v in self.headers.items() if k.lower() not in ("host", "content-length")}
+                upstream = proxy._session.request(
+                    self.command, f"{proxy.upstream}{self.path}", data=body, headers=headers, timeout=30
+                )
+                url = urlparse(self.path)
+                key = recording_key(self.command, url.path, url.query)
+                try:
+                    payload = upstream.json()
+                except ValueError:
+                    payload = upstream.text
+                with proxy._lock:
+                    proxy.exchanges[key] = {"key": key, "status": upstream.status_code, "body": payload}
+
+                self.send_response(upstream.status_code)
+                self.send_header("Content-Type", upstream.headers.get("Content-Type", "application/json"))
+                self.send_header("Content-Length", str(len(upstream.content)))
+                self.end_headers()
+                self.wfile.write(upstream.content)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+    def save(self, path: str):
+        with self._lock:
+            exchanges = sorted(self.exchanges.values(), key=lambda e: e["key"])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"exchanges": exchanges}, f, indent=1)
+        return len(exchanges)
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstream", default="http://localhost:4000")
+    parser.add_argument("--port", type=int, default=4100)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    proxy = RecordingProxy(args.upstream, port=args.port)
+    print(f"Recording {args.upstream} on http://127.0.0.1:{args.port}; Ctrl+C to save to {args.out}")
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Saved {proxy.save(args.out)} exchanges to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
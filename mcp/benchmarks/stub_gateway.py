@@ -0,0 +1,216 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+def _doctors(n=20):
+    return [{"id": f"doc-{i}", "name": f"Doctor {i}", "specialization": "General"} for i in range(n)]
+
+
+def _nutritionists(n=10):
+    return [{"id": f"nut-{i}", "name": f"Nutritionist {i}"} for i in range(n)]
+
+
+def _appointments(patient_id, n=10):
+    return [
+        {
+            "id": f"apt-{patient_id}-{i}",
+            "patientId": patient_id,
+            "doctorId": f"doc-{i % 20}",
+            "appointmentDate": f"2025-01-{i % 28 + 1:02d}",
+            "appointmentTime": "10:00",
+            "status": "SCHEDULED",
+            "updatedAt": "2025-01-01T00:00:00Z",
+        }
+        for i in range(n)
+    ]
+
+
+def _lab_tests(patient_id, n=5):
+    return [
+        {"id": f"lab-{patient_id}-{i}", "patientId": patient_id, "testId": f"test-{i}", "scheduledDate": f"2025-02-{i + 1:02d}",
+         "status": "PENDING", "updatedAt": "2025-01-01T00:00:00Z"}
+        for i in range(n)
+    ]
+
+
+def _prescriptions(patient_id, n=4):
+    return [
+        {"id": f"rx-{patient_id}-{i}", "patientId": patient_id, "medicine": f"Medicine {i}", "dosage": "1 tablet", "frequency": "twice daily"}
+        for i in range(n)
+    ]
+
+
+def _medical_records(patient_id, n=50):
+    return [
+        {"id": f"rec-{patient_id}-{i}", "patientId": patient_id, "date": f"2024-{i % 12 + 1:02d}-01", "title": f"Visit {i}", "notes": "Routine checkup. " * 20}
+        for i in range(n)
+    ]
+
+
+# (method, path regex) -> handler(match, query, body) -> (status, payload)
+ROUTES = [
+    ("GET", r"/doctors", lambda m, q, b: (200, _doctors())),
+    ("GET", r"/nutritionists", lambda m, q, b: (200, _nutritionists())),
+    ("GET", r"/appointments/patient", lambda m, q, b: (200, _appointments(q.get("patientId", ["p"])[0]))),
+    ("POST", r"/appointments", lambda m, q, b: (201, {"id": "apt-new", **b})),
+    ("PATCH", r"/appointments/([^/]+)", lambda m, q, b: (200, {"id": m.group(1), **b})),
+    ("DELETE", r"/appointments/([^/]+)", lambda m, q, b: (200, {"id": m.group(1)})),
+    ("GET", r"/medical-records/patient/([^/]+)", lambda m, q, b: (200, _medical_records(m.group(1)))),
+    ("GET", r"/booked-lab-tests/patient/([^/]+)", lambda m, q, b: (200, _lab_tests(m.group(1)))),
+    ("POST", r"/booked-lab-tests", lambda m, q, b: (201, {"id": "lab-new", **b})),
+    ("PATCH", r"/booked-lab-tests/([^/]+)/cancel", lambda m, q, b: (200, {"id": m.group(1), "status": "CANCELLED"})),
+    ("GET", r"/prescriptions/patient/([^/]+)", lambda m, q, b: (200, _prescriptions(m.group(1)))),
+    ("GET", r"/medicines/today/([^/]+)", lambda m, q, b: (200, _prescriptions(m.group(1), n=3))),
+]
+
+
+def recording_key(method: str, path: str, query: str = "") -> str:
+    """Requests match a recording by method, path and query with its parameters sorted."""
+    params = "&".join(sorted(query.split("&"))) if query else ""
+    return f"{method} {path}?{params}" if params else f"{method} {path}"
+
+
+def load_recording(path: str) -> Dict[str, Tuple[int, object]]:
+    """Recorded exchanges, as written by benchmarks.record_gateway: key -> (status, body)."""
+    with open(path, encoding="utf-8") as f:
+        exchanges = json.load(f)["exchanges"]
+    return {e["key"]: (e["status"], e["body"]) for e in exchanges}
+
+
+class StubGateway:
+    """In-process stand-in for the API gateway used by the benchmarks.
+
+    Speaks HTTP/1.1 with keep-alive, adds a fixed latency per request and counts
+    requests and accepted TCP connections so benchmarks can report reuse.
+    route_status forces a status code for matching paths, and error_rate makes
+    that fraction of all requests fail with a 503. With a recording, recorded
+    responses are replayed and only unrecorded requests fall back to ROUTES.
+    `updates` maps an item id to fields merged into that item in list responses.
+    GET responses carry an ETag and a matching If-None-Match gets a 304.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 route_latency: Optional[Dict[str, float]] = None,
+                 route_status: Optional[Dict[str, int]] = None, error_rate: float = 0.0, seed: int = 0,
+                 recording: Optional[str] = None):
+        self.recorded = load_recording(recording) if recording else {}
+        self.replayed = 0
+        self.not_modified = 0
+        self.updates: Dict[str, Dict] = {}
+        self.latency = latency
+        self.route_latency = route_latency or {}
+        self.route_status = route_status or {}
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self.paths: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one segment; otherwise Nagle + delayed ACK
+            # adds ~40ms to every response on a reused connection.
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                with stub._lock:
+                    stub.requests += 1
+                    stub.paths[url.path] = stub.paths.get(url.path, 0) + 1
+
+                delay = stub.latency
+                for pattern, route_delay in stub.route_latency.items():
+                    if re.fullmatch(pattern, url.path):
+                        delay = route_delay
+                if delay:
+                    time.sleep(delay)
+
+                status, payload = 404, {"message": f"Cannot {self.command} {url.path}"}
+                recorded = stub.recorded.get(recording_key(self.command, url.path, url.query))
+                if recorded is not None:
+                    status, payload = recorded
+                    with stub._lock:
+                        stub.replayed += 1
+                else:
+                    for method, pattern, handler in ROUTES:
+                        match = re.fullmatch(pattern, url.path)
+                        if method == self.command and match:
+                            status, payload = handler(match, parse_qs(url.query), body)
+                            break
+
+                with stub._lock:
+                    failed = stub.error_rate and stub._random.random() < stub.error_rate
+                if failed:
+                    status, payload = 503, {"message": "Service Unavailable"}
+                for pattern, forced in stub.route_status.items():
+                    if re.fullmatch(pattern, url.path):
+                        status, payload = forced, {"message": f"Forced {forced}"}
+
+                if stub.updates and isinstance(payload, list):
+                    payload = [
+                        {**item, **stub.updates[item["id"]]} if isinstance(item, dict) and item.get("id") in stub.updates else item
+                        for item in payload
+                    ]
+
+                data = json.dumps(payload).encode()
+                etag = f'W/"{hashlib.sha1(data).hexdigest()[:16]}"' if self.command == "GET" and status == 200 else None
+                if etag and self.headers.get("If-None-Match") == etag:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    status, data = 304, b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+    def start(self) -> "StubGateway":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
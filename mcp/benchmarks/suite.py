@@ -0,0 +1,258 @@
+"""Deterministic benchmark suite for the MCP layer, with stored baselines.
+
+Runs the MCP server in-process against the stub gateway (replaying
+benchmarks/recordings/*.json where recorded) and MCPClient against the fake
+LLM, so no docker-compose stack or Groq key is needed. Each scenario reports
+throughput, p50/p99 latency per operation and the peak Python heap of one
+extra, traced pass.
+
+Run from the mcp/ directory:
+    python -m benchmarks.suite                      # compare with baselines.json
+    python -m benchmarks.suite book_and_list -n 20  # one scenario
+    python -m benchmarks.suite --save-baseline      # accept current numbers
+
+Baselines are machine-specific: re-save them on the machine that runs the check.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.fake_llm import FakeLLM
+from benchmarks.stub_gateway import StubGateway
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES = os.path.join(BENCH_DIR, "baselines.json")
+RECORDING = os.path.join(BENCH_DIR, "recordings", "gateway.json")
+
+# name -> (default iterations, scenario(env, iterations) -> per-operation latencies)
+SCENARIOS: Dict[str, tuple] = {}
+
+
+def scenario(name: str, iterations: int):
+    def register(fn: Callable[["Env", int], Awaitable[List[float]]]):
+        SCENARIOS[name] = (iterations, fn)
+        return fn
+    return register
+
+
+class Env:
+    """The stub gateway, the fake LLM and a freshly reset server module shared by the scenarios."""
+
+    def __init__(self, stub: StubGateway, llm: FakeLLM):
+        self.stub = stub
+        self.llm = llm
+        import mcp_server
+        from response_cache import ResponseCache
+
+        self.server = mcp_server
+        self._cache_class = ResponseCache
+
+    def reset(self):
+        # Every scenario starts cold: no cached gateway responses, snapshots, idempotent replays or spent rate limits
+        self.server.cache = self._cache_class()
+        self.server.idempotency.clear()
+        self.server.admission.clear()
+        self.server.patient_context.clear()
+        self.server.patient_context.prefetch_enabled = True
+        self.stub.error_rate = 0.0
+        random.seed(0)
+
+
+async def timed(call: Awaitable) -> float:
+    start = time.perf_counter()
+    await call
+    return time.perf_counter() - start
+
+
+def chat_responder(body: Dict) -> Dict:
+    """Scripted LLM: picks a tool from keywords in the last user message."""
+    messages = body.get("messages") or []
+    if messages and messages[-1].get("role") in ("function", "tool"):
+        return {"content": "Done. Here is what I found for you."}
+    query = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "").lower()
+    if "book" in query:
+        return {"tool_calls": [{"name": "book_appointment", "arguments": {
+            "patient_id": "p1", "doctor_id": "doc-3", "date": "2025-03-02", "time": "10:00"}}]}
+    if "pending" in query:
+        return {"tool_calls": [{"name": "view_pending_appointments", "arguments": {"patient_id": "p1"}}]}
+    return {"content": "How can I help with your appointments?"}
+
+
+# ---------------- SCENARIOS ----------------
+@scenario("book_and_list", iterations=10)
+async def book_and_list(env: Env, iterations: int) -> List[float]:
+    """Two chat turns per user through MCPClient: book an appointment, then list pending ones."""
+    from groq import AsyncGroq
+    from mcp_client import MCPClient
+
+    env.llm.respond = chat_responder
+    client = MCPClient(echo=False)
+    client.groq = AsyncGroq(base_url=env.llm.base_url, api_key="fake")
+    await client.connect_to_server(env.server.mcp)
+    latencies = []
+    try:
+        for i in range(iterations):
+            user = f"user-{i}"
+            latencies.append(await timed(client.process_query("Book me with doctor doc-3 on March 2nd at 10", user)))
+            latencies.append(await timed(client.process_query("What are my pending appointments?", user)))
+    finally:
+        await client.cleanup()
+    return latencies
+
+
+@scenario("dashboard_100", iterations=5)
+async def dashboard_100(env: Env, iterations: int) -> List[float]:
+    """Pending appointments and lab tests for 100 patients in one batch tool call, cold cache each time."""
+    patients = [f"p{i}" for i in range(100)]
+    latencies = []
+    for _ in range(iterations):
+        env.reset()
+        latencies.append(await timed(env.server.mcp.call_tool("view_pending_items", {"patient_ids": patients})))
+    return latencies
+
+
+@scenario("concurrent_reads", iterations=64)
+async def concurrent_reads(env: Env, iterations: int) -> List[float]:
+    """Concurrent lab test lookups for distinct patients."""
+    return list(await asyncio.gather(*(
+        timed(env.server.mcp.call_tool("view_pending_lab_tests", {"patient_id": f"p{i}"}))
+        for i in range(iterations)
+    )))
+
+
+@scenario("flaky_gateway", iterations=64)
+async def flaky_gateway(env: Env, iterations: int) -> List[float]:
+    """Concurrent appointment lookups while 10% of gateway requests fail with 503 and are retried."""
+    env.stub.error_rate = 0.1
+    env.server.patient_context.prefetch_enabled = False  # measure retries, not prefetch traffic
+    return list(await asyncio.gather(*(
+        timed(env.server.mcp.call_tool("view_pending_appointments", {"patient_id": f"p{i}"}))
+        for i in range(iterations)
+    )))
+
+
+@scenario("patient_session", iterations=8)
+async def patient_session(env: Env, iterations: int) -> List[float]:
+    """Concurrent sessions reading one patient's working set tool by tool, with LLM think time in between."""
+    tools = ["view_pending_appointments", "view_pending_lab_tests", "view_all_prescriptions", "todays_medicine"]
+
+    async def session(patient_id):
+        latencies = []
+        for tool in tools:
+            latencies.append(await timed(env.server.mcp.call_tool(tool, {"patient_id": patient_id})))
+            await asyncio.sleep(0.02)
+        return latencies
+
+    sessions = await asyncio.gather(*(session(f"p{i}") for i in range(iterations)))
+    return [latency for latencies in sessions for latency in latencies]
+
+
+@scenario("records_qa", iterations=20)
+async def records_qa(env: Env, iterations: int) -> List[float]:
+    """Questions against one patient's medical records; the first builds the BM25 index."""
+    questions = ["cholesterol results", "last routine checkup", "blood pressure", "visit notes"]
+    env.server.patient_context.prefetch_enabled = False
+    return [
+        await timed(env.server.mcp.call_tool(
+            "question_from_medical_records", {"patient_id": "p1", "question": questions[i % len(questions)]}))
+        for i in range(iterations)
+    ]
+
+
+# ---------------- RUNNER ----------------
+def run_scenario(env: Env, name: str, iterations: int) -> Dict:
+    fn = SCENARIOS[name][1]
+    env.reset()
+    start = time.perf_counter()
+    latencies = sorted(asyncio.run(fn(env, iterations)))
+    elapsed = time.perf_counter() - start
+
+    # Heap is measured on a separate pass so tracing doesn't skew the timings
+    env.reset()
+    tracemalloc.start()
+    asyncio.run(fn(env, iterations))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def regressions(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    found = []
+    for key in ("p50_ms", "p99_ms", "peak_kb"):
+        if key in baseline and result[key] > baseline[key] * (1 + tolerance):
+            found.append(f"{key} {result[key]} > {baseline[key]}")
+    if "throughput" in baseline and result["throughput"] < baseline["throughput"] * (1 - tolerance):
+        found.append(f"throughput {result['throughput']} < {baseline['throughput']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("-n", "--iterations", type=int, help="override each scenario's iterations")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="latency added by the stub gateway")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ["MCP_TRACE_FILE"] = ""
+    os.environ["MCP_INDEX_DIR"] = tempfile.mkdtemp(prefix="records-index-")
+    os.environ["MCP_CATALOG_DIR"] = tempfile.mkdtemp(prefix="catalog-")
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    results, failed = {}, []
+    with StubGateway(latency=args.latency_ms / 1000, recording=RECORDING, seed=0) as stub, \
+            FakeLLM(first_token_delay=0.02, token_delay=0.001) as llm:
+        os.environ["API_GATEWAY_URL"] = stub.base_url  # read when mcp_server is imported
+        env = Env(stub, llm)
+        logging.getLogger().setLevel(logging.WARNING)
+
+        print(f"{'scenario':<18} {'ops':>5} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'peak KB':>9}")
+        for name in names:
+            iterations = args.iterations or SCENARIOS[name][0]
+            result = results[name] = run_scenario(env, name, iterations)
+            problems = [] if args.save_baseline else regressions(result, baselines.get(name, {}), args.tolerance)
+            flag = "  REGRESSION: " + "; ".join(problems) if problems else ""
+            print(f"{name:<18} {result['ops']:>5} {result['throughput']:>9.1f} {result['p50_ms']:>9.1f} "
+                  f"{result['p99_ms']:>9.1f} {result['peak_kb']:>9.1f}{flag}")
+            if problems:
+                failed.append(name)
+        print(f"gateway requests={stub.requests} replayed from recording={stub.replayed} llm requests={llm.requests}")
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(BASELINES, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baselines for {', '.join(names)} to {BASELINES}")
+    elif failed:
+        sys.exit(f"Regressed beyond {args.tolerance:.0%}: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+import os
+from collections import deque
+from typing import Deque, Dict, List
+
+# Rough chars-per-token ratio for English/JSON; good enough for budgeting
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(message: Dict) -> int:
+    content = message.get("content") or ""
+    return len(content) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def compact_tool_output(content: str, max_tokens: int) -> str:
+    """Strip JSON whitespace and truncate tool output that would still exceed max_tokens."""
+    # Compact JSON never contains a raw newline, so only indented output is re-encoded
+    if "\n" in content:
+        try:
+            content = json.dumps(json.loads(content), separators=(",", ":"), ensure_ascii=False)
+        except (TypeError, ValueError):
+            pass
+
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(content) > limit:
+        content = f"{content[:limit]}... [truncated {len(content) - limit} chars]"
+    return content
+
+
+class ConversationManager:
+    """Conversation history for MCPClient that stays within a token budget.
+
+    Messages are grouped into turns (a user message plus the tool results and
+    reply that follow it). Tool outputs are compacted as they are added. When the
+    prompt exceeds the budget the oldest turns are folded into a short running
+    summary, always keeping the current turn intact.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        token_budget: int = int(os.getenv("MCP_TOKEN_BUDGET", "8000")),
+        max_tool_output_tokens: int = int(os.getenv("MCP_MAX_TOOL_OUTPUT_TOKENS", "1500")),
+        max_summary_tokens: int = int(os.getenv("MCP_MAX_SUMMARY_TOKENS", "400")),
+    ):
+        self.system = {"role": "system", "content": system_prompt}
+        self.token_budget = token_budget
+        self.max_tool_output_tokens = max_tool_output_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.turns: List[List[Dict]] = []
+        self.summary = ""
+        self.turn_count = 0
+        self.prompt_sizes: Deque[Dict] = deque(maxlen=100)  # one entry per recent completion request
+
+    def append(self, message: Dict):
+        if message.get("role") in ("function", "tool"):
+            message = {**message, "content": compact_tool_output(message.get("content") or "", self.max_tool_output_tokens)}
+        if message.get("role") == "user" or not self.turns:
+            self.turns.append([])
+            self.turn_count += 1
+        self.turns[-1].append(message)
+
+    def messages(self) -> List[Dict]:
+        """Messages to send with the next completion, after enforcing the budget."""
+        while len(self.turns) > 1 and self._tokens(self._assemble()) > self.token_budget:
+            self._fold(self.turns.pop(0))
+
+        messages = self._assemble()
+        self.prompt_sizes.append({
+            "turn": self.turn_count,
+            "messages": len(messages),
+            "tokens": self._tokens(messages),
+            "bytes": sum(len((m.get("content") or "").encode()) for m in messages),
+        })
+        return messages
+
+    def _assemble(self) -> List[Dict]:
+        messages = [self.system]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of earlier conversation: {self.summary}"})
+        for turn in self.turns:
+            messages.extend(turn)
+        return messages
+
+    def _tokens(self, messages: List[Dict]) -> int:
+        return sum(estimate_tokens(m) for m in messages)
+
+    def _fold(self, turn: List[Dict]):
+        """Replace a dropped turn with one extractive line in the running summary."""
+        parts = []
+        for message in turn:
+            content = " ".join((message.get("content") or "").split())
+            if message["role"] == "user":
+                parts.append(f"user asked '{content[:120]}'")
+            elif message["role"] in ("function", "tool"):
+                parts.append(f"called {message.get('name')}")
+            elif message["role"] == "assistant":
+                parts.append(f"assistant replied '{content[:160]}'")
+        self.summary = f"{self.summary} {'; '.join(parts)}.".strip()
+
+        limit = self.max_summary_tokens * CHARS_PER_TOKEN
+        if len(self.summary) > limit:
+            self.summary = "..." + self.summary[-limit:]
@@ -0,0 +1,250 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from idempotency import current_idempotency_key
+from metrics import GATEWAY_LATENCY, GATEWAY_REQUEST_BYTES, GATEWAY_RESPONSE_BYTES, GATEWAY_RESPONSES, current_tool
+from resilience import Resilience
+from tracing import child_span
+
+# (connect, read) timeouts in seconds, see https://requests.readthedocs.io/en/latest/user/advanced/#timeouts
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("GATEWAY_CONNECT_TIMEOUT", "3.05"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("GATEWAY_READ_TIMEOUT", "10"))
+
+# Routes that are known to be slower than the rest get a longer read timeout.
+# Keys are the route templates the tools pass to GatewayClient.request().
+ROUTE_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "/medical-records/patient/{patient_id}": (DEFAULT_CONNECT_TIMEOUT, 30.0),
+}
+
+# Read routes where identical concurrent GETs share one upstream request
+COALESCED_ROUTES = {
+    "/appointments/patient",
+    "/booked-lab-tests/patient/{patient_id}",
+    "/doctors",
+    "/nutritionists",
+}
+
+
+class GatewayClient:
+    """Shared keep-alive HTTP client for the API gateway.
+
+    All tools go through one requests.Session so TCP connections to the
+    gateway are pooled and reused instead of being opened per call. The
+    a*-methods run the blocking request on a bounded worker pool so async
+    tools never block the MCP server's event loop, and go through the
+    retry/circuit-breaker/deadline layer in resilience.py.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_connections: int = int(os.getenv("GATEWAY_POOL_CONNECTIONS", "4")),
+        pool_maxsize: int = int(os.getenv("GATEWAY_POOL_MAXSIZE", "32")),
+        pool_block: bool = os.getenv("GATEWAY_POOL_BLOCK", "false").lower() == "true",
+        default_timeout: Tuple[float, float] = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+        route_timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        max_workers: Optional[int] = None,
+        coalesced_routes: Optional[set] = None,
+        resilience: Optional[Resilience] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.default_timeout = default_timeout
+        self.route_timeouts = dict(ROUTE_TIMEOUTS if route_timeouts is None else route_timeouts)
+        self.coalesced_routes = set(COALESCED_ROUTES if coalesced_routes is None else coalesced_routes)
+        self.resilience = resilience or Resilience()
+        self.pool_maxsize = pool_maxsize
+        # One worker per pooled connection unless told otherwise
+        self.max_workers = max_workers or int(os.getenv("GATEWAY_MAX_WORKERS", str(pool_maxsize)))
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gateway")
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+        self._coalesced = 0
+        self._pending_reads: Dict[Tuple, asyncio.Task] = {}
+
+    def timeout_for(self, route: str) -> Tuple[float, float]:
+        return self.route_timeouts.get(route, self.default_timeout)
+
+    def request(self, method: str, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """Send a request to `route` (e.g. "/booked-lab-tests/patient/{patient_id}")."""
+        path = route.format(**path_params) if path_params else route
+        kwargs.setdefault("timeout", self.timeout_for(route))
+
+        with self._lock:
+            self._requests += 1
+        try:
+            return self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def get(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return self.request("GET", route, path_params, **kwargs)
+
+    def post(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return self.request("POST", route, path_params, **kwargs)
+
+    def patch(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return self.request("PATCH", route, path_params, **kwargs)
+
+    def delete(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return self.request("DELETE", route, path_params, **kwargs)
+
+    async def arequest(self, method: str, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        if method == "GET" and route in self.coalesced_routes:
+            return await self._single_flight(route, path_params, **kwargs)
+        return await self._run(method, route, path_params, **kwargs)
+
+    async def _single_flight(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """Join an identical GET that is already in flight instead of sending another one."""
+        key = (
+            route,
+            tuple(sorted((path_params or {}).items())),
+            tuple(sorted((kwargs.get("params") or {}).items())),
+            # Conditional GETs may get a 304, which only means something to their own caller
+            tuple(sorted((kwargs.get("headers") or {}).items())),
+        )
+        task = self._pending_reads.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run("GET", route, path_params, **kwargs))
+            self._pending_reads[key] = task
+            task.add_done_callback(lambda _: self._pending_reads.pop(key, None))
+        else:
+            with self._lock:
+                self._coalesced += 1
+        # Shield so one caller giving up does not cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def _run(self, method: str, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        timeout = kwargs.pop("timeout", None) or self.timeout_for(route)
+        idempotency_key = current_idempotency_key()
+        if method != "GET" and idempotency_key:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "Idempotency-Key": idempotency_key}
+
+        async def send(time_left: Optional[float]) -> requests.Response:
+            # Never wait on the socket longer than the caller's deadline allows
+            attempt_timeout = timeout if time_left is None else tuple(min(t, time_left) for t in timeout)
+            return await self._submit(method, route, path_params, timeout=attempt_timeout, **kwargs)
+
+        return await self.resilience.call(method, route, send)
+
+    async def _submit(self, method: str, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        loop = asyncio.get_running_loop()
+        # Labels are read here, on the loop side: executor threads don't inherit contextvars
+        labels = {"tool": current_tool.get(), "method": method, "route": route}
+        status = "error"
+        with child_span(f"gateway {method} {route}", method=method, route=route) as span:
+            if span is not None:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), "traceparent": span.traceparent}
+            call = functools.partial(self.request, method, route, path_params, **kwargs)
+            with self._lock:
+                self._in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = await loop.run_in_executor(self._executor, call)
+                status = str(response.status_code)
+                GATEWAY_REQUEST_BYTES.inc(len(response.request.body or b""), **labels)
+                GATEWAY_RESPONSE_BYTES.inc(len(response.content), **labels)
+                return response
+            except Exception as e:
+                status = type(e).__name__
+                raise
+            finally:
+                GATEWAY_LATENCY.observe(time.perf_counter() - start, **labels)
+                GATEWAY_RESPONSES.inc(status=status, **labels)
+                if span is not None:
+                    span.set(status_code=status)
+                    if status.startswith("5"):
+                        span.status = "error"
+                with self._lock:
+                    self._in_flight -= 1
+
+    async def aget(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return await self.arequest("GET", route, path_params, **kwargs)
+
+    async def apost(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return await self.arequest("POST", route, path_params, **kwargs)
+
+    async def apatch(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return await self.arequest("PATCH", route, path_params, **kwargs)
+
+    async def adelete(self, route: str, path_params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        return await self.arequest("DELETE", route, path_params, **kwargs)
+
+    def pool_stats(self) -> Dict:
+        """Connection pool metrics; connections_opened far below requests means keep-alive is working."""
+        pools = []
+        manager = self._adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+            pools.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle_connections": idle,
+                "maxsize": self.pool_maxsize,
+            })
+
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "errors": self._errors,
+                "in_flight": self._in_flight,
+                "coalesced": self._coalesced,
+                "max_workers": self.max_workers,
+                "pools": pools,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+        logging.info("Gateway client closed")
+
+
+async def fan_out(calls: Dict[str, Awaitable[requests.Response]]) -> Tuple[Dict, Dict]:
+    """Await independent gateway calls concurrently and split them into (data, errors).
+
+    `data` holds the decoded JSON of every call that succeeded; `errors` holds a
+    description of every call that raised or returned a non-2xx status, so one
+    failing source never takes the others down with it.
+    """
+    names = list(calls)
+    results = await asyncio.gather(*calls.values(), return_exceptions=True)
+
+    data, errors = {}, {}
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            errors[name] = {"error": str(result)}
+        elif not result.ok:
+            errors[name] = {"error": result.text, "status_code": result.status_code}
+        else:
+            try:
+                data[name] = result.json()
+            except ValueError as e:
+                errors[name] = {"error": f"Invalid JSON from gateway: {e}"}
+    return data, errors
@@ -0,0 +1,151 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Set
+
+_idempotency_key: ContextVar[Optional[str]] = ContextVar("idempotency_key", default=None)
+
+
+def current_idempotency_key() -> Optional[str]:
+    """Key of the write being executed, sent to the gateway as the Idempotency-Key header."""
+    return _idempotency_key.get()
+
+
+def derive_key(tool_name: str, arguments: Dict) -> str:
+    payload = json.dumps([tool_name, arguments], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Bounded, expiring store of recent write results, keyed by idempotency key.
+
+    A repeat of a write that already succeeded inside the window gets the stored
+    result back without touching the gateway; a repeat that arrives while the
+    first call is still in flight waits for and shares its result. Failed writes
+    are not stored, so they can be retried.
+
+    A write may name the entity it touched (e.g. an appointment id). A later,
+    different write to the same entity drops the stored results of the earlier
+    ones, so repeating an earlier write after it was superseded (rescheduling
+    back to the first date, booking again after a cancel) reaches the gateway.
+    """
+
+    def __init__(self, ttl: float = float(os.getenv("MCP_IDEMPOTENCY_TTL", "120")),
+                 maxsize: int = int(os.getenv("MCP_IDEMPOTENCY_MAXSIZE", "4096"))):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._results: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, result)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._entity_keys: Dict[Hashable, Set[str]] = {}  # entity -> keys of stored writes to it
+        self._key_entity: Dict[str, Hashable] = {}
+        self.replayed = 0
+        self.joined = 0
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._forget(key)
+            return None
+        return entry[1]
+
+    def _forget(self, key: str):
+        self._results.pop(key, None)
+        entity = self._key_entity.pop(key, None)
+        if entity is not None:
+            keys = self._entity_keys.get(entity)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._entity_keys[entity]
+
+    def _remember(self, key: str, result: Dict, entity: Optional[Hashable] = None):
+        if entity is not None:
+            # A different write to the same entity supersedes the stored ones
+            for stale in list(self._entity_keys.get(entity, ())):
+                if stale != key:
+                    self._forget(stale)
+        self._forget(key)
+        self._results[key] = (time.monotonic() + self.ttl, result)
+        if entity is not None:
+            self._key_entity[key] = entity
+            self._entity_keys.setdefault(entity, set()).add(key)
+        while len(self._results) > self.maxsize:
+            self._forget(next(iter(self._results)))
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Dict]],
+                  entity_of: Optional[Callable[[Dict], Optional[Hashable]]] = None) -> Dict:
+        """Run the write `call` once per key; entity_of(result) names the entity it touched."""
+        stored = self._lookup(key)
+        if stored is not None:
+            self.replayed += 1
+            return {**stored, "replayed": True}
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.joined += 1
+            return {**await asyncio.shield(task), "replayed": True}
+
+        token = _idempotency_key.set(key)
+        try:
+            # The task copies the current context, so the gateway client sees the key
+            task = asyncio.ensure_future(call())
+        finally:
+            _idempotency_key.reset(token)
+        self._in_flight[key] = task
+
+        def finish(done: asyncio.Task):
+            self._in_flight.pop(key, None)
+            if not done.cancelled() and done.exception() is None and done.result().get("success"):
+                result = done.result()
+                self._remember(key, result, entity_of(result) if entity_of else None)
+
+        task.add_done_callback(finish)
+        return await asyncio.shield(task)
+
+    def clear(self):
+        """Forget stored results; writes still in flight are unaffected."""
+        self._results.clear()
+        self._entity_keys.clear()
+        self._key_entity.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "stored": len(self._results),
+            "in_flight": len(self._in_flight),
+            "replayed": self.replayed,
+            "joined": self.joined,
+            "ttl": self.ttl,
+        }
+
+    def idempotent(self, tool_name: str, entity: Optional[Callable[[Dict, Dict], Optional[Hashable]]] = None):
+        """Decorate an async write tool so repeats are suppressed.
+
+        Adds an optional `idempotency_key` argument; without it the key is
+        derived from the tool name and its arguments. `entity(arguments, result)`
+        names what the write touched, see the class docstring.
+        """
+        def decorator(fn):
+            sig = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args, idempotency_key=None, **kwargs):
+                bound = sig.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = dict(bound.arguments)
+                key = idempotency_key or derive_key(tool_name, arguments)
+                entity_of = (lambda result: entity(arguments, result)) if entity else None
+                return await self.run(key, lambda: fn(*args, **kwargs), entity_of)
+
+            key_param = inspect.Parameter("idempotency_key", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=None)
+            wrapper.__signature__ = sig.replace(parameters=[*sig.parameters.values(), key_param])
+            return wrapper
+
+        return decorator
@@ -1,67 +1,145 @@
 import asyncio
+import importlib
 import json
-from typing import Optional, List, Dict
-from contextlib import AsyncExitStack
-from groq import Groq
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, List, Dict
 from dotenv import load_dotenv
 
+from conversation import ConversationManager
+from tracing import Tracer, child_span
+
+if TYPE_CHECKING:
+    # The mcp package (~0.7s to import) is loaded when connecting, see connect_to_server
+    from mcp import ClientSession
+    from session_pool import SessionPool
+    from tool_catalog import ToolSelector
+
 load_dotenv()
 
+MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+SYSTEM_PROMPT = (
+    "You are Hygieia, a healthcare assistant. "
+    "You can use MCP tools (like book_appointment, cancel_lab_test, etc.) "
+    "and MCP resources (like resource://appointments/{patient_id}, "
+    "resource://prescriptions/{patient_id}, resource://doctors, etc.). "
+    "Ask only for missing info. Always respond concisely."
+)
+
+# Per-user conversations kept in memory; the least recently active are dropped first
+MAX_CONVERSATIONS = int(os.getenv("MCP_MAX_CONVERSATIONS", "1000"))
+
 
 class MCPClient:
-    def __init__(self):
-        self.session: Optional[ClientSession] = None
+    """Chat client for the Hygieia MCP server.
+
+    One client serves any number of users: the MCP sessions (a SessionPool),
+    the tool and resource schemas and the Groq client are shared, while each
+    user_id gets its own conversation. Turns of the same user run one at a
+    time; turns of different users run concurrently.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_tools: int = int(os.getenv("MCP_MAX_CONCURRENT_TOOLS", "4")),
+        tool_timeout: float = float(os.getenv("MCP_TOOL_TIMEOUT", "30")),
+        pool_size: int = int(os.getenv("MCP_SESSION_POOL_SIZE", "1")),
+        echo: bool = True,
+    ):
+        self.pool: Optional["SessionPool"] = None
+        self.pool_size = pool_size
+        self.echo = echo  # print streamed replies and tool calls; off when serving many users
+        self.max_concurrent_tools = max_concurrent_tools
+        self.tool_timeout = tool_timeout
         self.tools: List[Dict] = []
         self.resources: Dict[str, str] = {}  # uri -> description
-        self.exit_stack = AsyncExitStack()
-        self.groq = Groq()
-        self.conversation: List[Dict] = [
-            {
-                "role": "system",
-                "content": (
-                    "You are Hygieia, a healthcare assistant. "
-                    "You can use MCP tools (like book_appointment, cancel_lab_test, etc.) "
-                    "and MCP resources (like resource://appointments/{patient_id}, "
-                    "resource://prescriptions/{patient_id}, resource://doctors, etc.). "
-                    "Ask only for missing info. Always respond concisely."
-                ),
-            }
-        ]
+        self.tool_selector: Optional["ToolSelector"] = None
+        self._groq = None
+        self.last_timings: Dict[str, float] = {}  # ttft / total of the last turn, in seconds
+        self.tracer = Tracer("mcp-client")
+        self.conversation = ConversationManager(SYSTEM_PROMPT)  # the default, single-user chat
+        self.conversations: "OrderedDict[str, ConversationManager]" = OrderedDict()
+        self._turn_locks: Dict[Optional[str], asyncio.Lock] = {}
+
+    @property
+    def groq(self):
+        # groq takes ~0.3s to import, so it is loaded on first use (or while connecting)
+        if self._groq is None:
+            from groq import AsyncGroq
+
+            self._groq = AsyncGroq()
+        return self._groq
+
+    @groq.setter
+    def groq(self, client):
+        self._groq = client
+
+    @property
+    def session(self) -> Optional["ClientSession"]:
+        return self.pool.sessions[0] if self.pool and self.pool.sessions else None
+
+    def conversation_for(self, user_id: Optional[str]) -> ConversationManager:
+        if user_id is None:
+            return self.conversation
+        conversation = self.conversations.get(user_id)
+        if conversation is None:
+            conversation = self.conversations[user_id] = ConversationManager(SYSTEM_PROMPT)
+            while len(self.conversations) > MAX_CONVERSATIONS:
+                evicted, _ = self.conversations.popitem(last=False)
+                self._turn_locks.pop(evicted, None)
+        self.conversations.move_to_end(user_id)
+        return conversation
 
     async def connect_to_server(self, server_script_path: str):
-        is_python = server_script_path.endswith(".py")
-        is_js = server_script_path.endswith(".js")
-        if not (is_python or is_js):
-            raise ValueError("Server script must be a .py or .js file")
-
-        command = "python" if is_python else "node"
-        server_params = StdioServerParameters(command=command, args=[server_script_path], env=None)
-
-        stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
-        await self.session.initialize()
-
-        # Discover tools
-        tool_response = await self.session.list_tools()
-        print("\n📌 Tools:")
-        for tool in tool_response.tools:
-            print(f"- {tool.name}: {tool.description}")
-        print("-" * 20)
-        self.tools = self.convert_to_groq_tools(tool_response.tools)
-
-        # Discover resources
-        resource_response = await self.session.list_resources()
-        print("\n📌 Resources:")
-        for res in resource_response.resources:
-            print(f"- {res.uri}: {res.description}")
-            self.resources[res.uri] = res.description
-        print("-" * 20)
+        """Open the session pool and load the tool and resource catalog once for every user.
+
+        The catalog is cached on disk under the version the server reports on
+        initialize, so a reconnect to an unchanged server skips discovery.
+        """
+        # Import groq in a thread while the server starts, instead of before or after it
+        groq_import = asyncio.ensure_future(asyncio.to_thread(importlib.import_module, "groq"))
+        from session_pool import SessionPool, server_label
+        from tool_catalog import ToolSelector, catalog_key, load_catalog, save_catalog
+
+        self.pool = SessionPool(server_script_path, self.pool_size)
+        try:
+            await self.pool.start()
+        finally:
+            await groq_import
+
+        key = catalog_key(server_label(server_script_path), self.pool.server_info)
+        catalog = load_catalog(key)
+        if catalog is None:
+            async with self.pool.lease() as session:
+                tool_response = await session.list_tools()
+                resource_response = await session.list_resources()
+            catalog = {
+                "tools": self.convert_to_groq_tools(tool_response.tools),
+                "resources": {str(res.uri): res.description for res in resource_response.resources},
+            }
+            save_catalog(key, catalog)
+
+        self.tools = catalog["tools"]
+        self.resources = catalog["resources"]
+        self.tool_selector = ToolSelector(self.tools)
+
+        if self.echo:
+            print("\n📌 Tools:")
+            for tool in self.tools:
+                print(f"- {tool['function']['name']}: {tool['function']['description']}")
+            print("-" * 20)
+            print("\n📌 Resources:")
+            for uri, description in self.resources.items():
+                print(f"- {uri}: {description}")
+            print("-" * 20)
 
     async def cleanup(self):
-        await self.exit_stack.aclose()
+        if self.pool:
+            await self.pool.close()
+        if self._groq is not None:
+            await self._groq.close()
 
     def convert_to_groq_tools(self, tools):
         groq_tools = []
@@ -84,58 +162,132 @@ class MCPClient:
             groq_tools.append(groq_tool)
         return groq_tools
 
-    async def process_query(self, query: str):
+    async def process_query(self, query: str, user_id: Optional[str] = None) -> str:
+        """Run one chat turn for `user_id` (the default conversation if None); returns the reply."""
         if not self.tools and not self.resources:
             raise RuntimeError("No tools or resources loaded from MCP server.")
 
-        self.conversation.append({"role": "user", "content": query})
+        conversation = self.conversation_for(user_id)
+        lock = self._turn_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            with self.tracer.span("chat.turn", query_chars=len(query), user=user_id) as turn_span:
+                conversation.append({"role": "user", "content": query})
+                turn_start = time.perf_counter()
+                timings: Dict[str, float] = {}
 
-        response = self.groq.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=self.conversation,
-            tools=self.tools,  # tools get passed for function calling
-        )
+                # Only the tool schemas relevant to this query go into the prompt (MCP_TOOL_TOP_K)
+                tools = self.tool_selector.select(query) if self.tool_selector else self.tools
+                full_text, tool_calls = await self.stream_completion(
+                    "llm.completion",
+                    timings,
+                    turn_start,
+                    messages=conversation.messages(),
+                    tools=tools,  # tools get passed for function calling
+                )
 
-        full_text = ""
-        if response.choices:
-            msg = response.choices[0].message
-
-            # Handle tool calls
-            if hasattr(msg, "tool_calls") and msg.tool_calls:
-                for tc in msg.tool_calls:
-                    tool_name = tc.function.name
-                    print(f"⚡ Calling tool {tool_name} with args: {tc.function.arguments}")
-                    try:
-                        tool_args = json.loads(tc.function.arguments)
-                    except Exception:
-                        tool_args = {}
-                    try:
-                        result = await self.session.call_tool(tool_name, tool_args)
-                        tool_output = "".join(
-                            [part.text for part in getattr(result, "content", []) if hasattr(part, "text")]
+                # Handle tool calls
+                if tool_calls:
+                    # Independent tool calls of one turn run concurrently; gather keeps
+                    # their original order so the follow-up prompt is deterministic
+                    semaphore = asyncio.Semaphore(self.max_concurrent_tools)
+                    outputs = await asyncio.gather(
+                        *(self.run_tool_call(tc, semaphore) for tc in tool_calls)
+                    )
+                    for tool_name, tool_output in outputs:
+                        conversation.append(
+                            {"role": "function", "name": tool_name, "content": tool_output}
                         )
-                    except Exception as e:
-                        tool_output = f"Error calling tool {tool_name}: {e}"
 
-                    self.conversation.append(
-                        {"role": "function", "name": tool_name, "content": tool_output}
+                    full_text, _ = await self.stream_completion(
+                        "llm.followup", timings, turn_start, messages=conversation.messages()
                     )
 
-                followup = self.groq.chat.completions.create(
-                    model="llama-3.3-70b-versatile", messages=self.conversation
-                )
-                if followup.choices and followup.choices[0].message.content:
-                    full_text = followup.choices[0].message.content.strip()
+                timings["total"] = time.perf_counter() - turn_start
+                self.last_timings = timings
+                if full_text:
+                    conversation.append({"role": "assistant", "content": full_text})
+
+                turn = conversation.turn_count
+                sizes = [str(size["tokens"]) for size in conversation.prompt_sizes if size["turn"] == turn]
+                tool_bytes = len(json.dumps(tools, separators=(",", ":")))
+                turn_span.set(tool_calls=len(tool_calls), prompt_tokens=", ".join(sizes),
+                              tools_sent=len(tools), tool_schema_bytes=tool_bytes, **timings)
+                if self.echo:
+                    print(f"📏 Prompt tokens this turn: {', '.join(sizes)} "
+                          f"({len(tools)}/{len(self.tools)} tool schemas, {tool_bytes} bytes)")
+                return full_text
 
-            # Handle plain text responses
-            elif msg.content:
-                full_text = msg.content.strip()
+    async def stream_completion(self, span_name: str, timings: Dict[str, float], turn_start: float, **kwargs):
+        """Stream a completion, printing tokens as they arrive; returns (text, tool_calls).
 
-        # Print Groq reply
-        if full_text:
-            print(f"Groq: {full_text}")
-            self.conversation.append({"role": "assistant", "content": full_text})
+        The time to the turn's first token is recorded in timings["ttft"].
+        """
+        with child_span(span_name, model=MODEL) as span:
+            start = time.perf_counter()
+            stream = await self.groq.chat.completions.create(model=MODEL, stream=True, **kwargs)
 
+            parts: List[str] = []
+            tool_calls: Dict[int, Dict] = {}  # index -> tool call assembled from deltas
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+
+                if delta.content:
+                    if not parts:
+                        timings.setdefault("ttft", time.perf_counter() - turn_start)
+                        if span is not None:
+                            span.set(first_token_s=round(time.perf_counter() - start, 4))
+                        if self.echo:
+                            print("Groq: ", end="", flush=True)
+                    if self.echo:
+                        print(delta.content, end="", flush=True)
+                    parts.append(delta.content)
+
+                for tc in delta.tool_calls or []:
+                    call = tool_calls.setdefault(
+                        tc.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+                    )
+                    if tc.id:
+                        call["id"] = tc.id
+                    if tc.function and tc.function.name:
+                        call["function"]["name"] += tc.function.name
+                    if tc.function and tc.function.arguments:
+                        call["function"]["arguments"] += tc.function.arguments
+
+            if parts and self.echo:
+                print()
+            if span is not None:
+                span.set(output_chars=sum(len(p) for p in parts), tool_calls=len(tool_calls))
+            return "".join(parts).strip(), [tool_calls[i] for i in sorted(tool_calls)]
+
+    async def run_tool_call(self, tc: Dict, semaphore: asyncio.Semaphore):
+        tool_name = tc["function"]["name"]
+        if self.echo:
+            print(f"⚡ Calling tool {tool_name} with args: {tc['function']['arguments']}")
+        try:
+            tool_args = json.loads(tc["function"]["arguments"])
+        except Exception:
+            tool_args = {}
+        with child_span("mcp.call_tool", tool=tool_name) as span:
+            # The server continues this trace from the traceparent in the request's _meta
+            meta = {"traceparent": span.traceparent} if span is not None else None
+            try:
+                async with semaphore:
+                    result = await asyncio.wait_for(
+                        self.pool.call_tool(tool_name, tool_args, meta=meta), timeout=self.tool_timeout
+                    )
+                texts = [part.text for part in getattr(result, "content", []) if hasattr(part, "text")]
+                # The server sends one compact JSON part per tool result; use it as is
+                tool_output = texts[0] if len(texts) == 1 else "".join(texts)
+            except asyncio.TimeoutError:
+                tool_output = f"Error calling tool {tool_name}: timed out after {self.tool_timeout}s"
+            except Exception as e:
+                tool_output = f"Error calling tool {tool_name}: {e}"
+            if span is not None and tool_output.startswith("Error calling tool"):
+                span.status = "error"
+                span.set(error=tool_output)
+        return tool_name, tool_output
 
     async def fetch_resource(self, uri: str):
         """Fetch a resource dynamically from the server"""
@@ -144,7 +296,7 @@ class MCPClient:
 
         print(f"\n📥 Fetching resource {uri}...")
         try:
-            result = await self.session.read_resource(uri)
+            result = await self.pool.read_resource(uri)
             print(f"Resource {uri} → {result}")
             return result
         except Exception as e:
@@ -175,7 +327,10 @@ async def chat_loop(client: MCPClient):
 async def main():
     client = MCPClient()
     try:
-        await client.connect_to_server("C:/Users/Admin/Desktop/Hygieia-Backend/mcp/mcp_server.py")
+        # MCP_SERVER_URL points at a long-running server, e.g. http://localhost:4007/mcp
+        await client.connect_to_server(
+            os.getenv("MCP_SERVER_URL", "C:/Users/Admin/Desktop/Hygieia-Backend/mcp/mcp_server.py")
+        )
         await client.fetch_resource("resource://doctors")
         await chat_loop(client)
     finally:
@@ -1,24 +1,349 @@
+import time
+
+# Taken before the imports below so start-up time can be reported
+IMPORT_STARTED = time.perf_counter()
+
+import argparse
+import asyncio
+import hashlib
+import inspect
 import logging
 import os
-import requests
 import json
+from contextlib import nullcontext
 from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ResourceError, ToolError
+from mcp.server.fastmcp.resources import FunctionResource
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import TextContent
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from admission import PRIORITY_BULK, PRIORITY_READ, PRIORITY_WRITE, AdmissionController, Rejected
+from gateway_client import GatewayClient, fan_out
+from idempotency import IdempotencyStore
+from metrics import (REGISTRY, TOOL_CALLS, TOOL_ENCODE_SECONDS, TOOL_LATENCY, TOOL_OUTPUTS_CAPPED, TOOL_RESPONSE_BYTES,
+                     current_tool, start_metrics_server)
+from output_encoder import OutputEncoder
+from patient_context import PatientContextStore
+from projection import items_of, paginate, split_resource_query
+from records_index import RecordsIndex
+from resilience import deadline_scope
+from response_cache import ResponseCache
+from tracing import Tracer
+
+# Total time a single tool or resource call may take, gateway retries included
+TOOL_DEADLINE = float(os.getenv("MCP_TOOL_DEADLINE", "20"))
+
+# Network transport settings (ignored over stdio)
+MCP_HOST = os.getenv("MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.getenv("MCP_PORT", "4007"))
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", "1"))
+# Workers don't share sessions, so several workers need stateless HTTP
+MCP_STATELESS_HTTP = os.getenv("MCP_STATELESS_HTTP", "0") == "1"
+
+
+def _result_texts(result):
+    """Text of each content part of a tool result or resource read."""
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, dict):
+        return [json.dumps(result)]
+    texts = []
+    for part in result:
+        text = getattr(part, "text", None)
+        if text is None:
+            text = getattr(part, "content", "")
+        texts.append(text)
+    return texts
+
+
+def _is_error(texts) -> bool:
+    # Tools put "success" and resources put "error" first, so the head of the
+    # payload is enough to tell a failure without parsing the whole result
+    head = texts[0][:48].replace(" ", "") if texts and isinstance(texts[0], str) else ""
+    return '"success":false' in head or '"error"' in head
+
+
+class HygieiaMCP(FastMCP):
+    """FastMCP with a per-call deadline that gateway requests inherit, plus call metrics and tracing."""
+
+    async def _observed(self, kind: str, name: str, call, timeout_error, patient_id=None):
+        token = current_tool.set(name)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with tracer.span(f"{kind} {name}", parent=self._traceparent(), kind=kind) as span:
+                try:
+                    async with admission.admit(name, patient_id):
+                        patient_context.prefetch(patient_id)
+                        # Batch tools give every item its own deadline (run_batch), so they always report each item
+                        batch = kind == "tool" and name in BATCH_TOOLS
+                        with nullcontext() if batch else deadline_scope(TOOL_DEADLINE):
+                            try:
+                                result = await asyncio.wait_for(call, None if batch else TOOL_DEADLINE)
+                            except asyncio.TimeoutError:
+                                outcome = "timeout"
+                                raise timeout_error
+                except Rejected as e:
+                    call.close()
+                    outcome = e.reason
+                    span.status = "error"
+                    span.set(outcome=outcome, retry_after=round(e.retry_after, 3))
+                    return self._rejection(kind, e)
+                texts = _result_texts(result)
+                size = sum(len(t) for t in texts)
+                TOOL_RESPONSE_BYTES.observe(size, kind=kind, name=name)
+                outcome = "error" if _is_error(texts) else "ok"
+                span.set(response_bytes=size, outcome=outcome)
+                if outcome == "error":
+                    span.status = "error"
+                return result
+        finally:
+            TOOL_LATENCY.observe(time.perf_counter() - start, kind=kind, name=name)
+            TOOL_CALLS.inc(kind=kind, name=name, outcome=outcome)
+            current_tool.reset(token)
+
+    def _rejection(self, kind: str, rejected: Rejected):
+        """Result for a call turned away by admission control, telling the caller when to retry."""
+        error = {"error": str(rejected), "reason": rejected.reason, "retry_after": round(rejected.retry_after, 2)}
+        if kind == "tool":
+            return [TextContent(type="text", text=encoder.dumps({"success": False, **error}))]
+        return [ReadResourceContents(content=encoder.dumps(error), mime_type="text/plain")]
+
+    def _traceparent(self):
+        """Trace context the client sent in the request's _meta, if any."""
+        try:
+            meta = self.get_context().request_context.meta
+        except ValueError:
+            return None
+        return getattr(meta, "traceparent", None)
+
+    def _resource_match(self, uri):
+        """(name, template parameters) of the resource or template serving `uri`."""
+        uri = str(uri)
+        for resource in self._resource_manager.list_resources():
+            if str(resource.uri) == uri:
+                return resource.name, {}
+        for template in self._resource_manager.list_templates():
+            params = template.matches(uri)
+            if params is not None:
+                return template.name, params
+        return "unknown", {}
+
+    def _encode(self, kind: str, name: str, result, max_bytes=None) -> str:
+        start = time.perf_counter()
+        text, capped = encoder.encode(result, max_bytes)
+        TOOL_ENCODE_SECONDS.observe(time.perf_counter() - start, kind=kind, name=name)
+        if capped:
+            TOOL_OUTPUTS_CAPPED.inc(kind=kind, name=name)
+        return text
 
-mcp = FastMCP("Hygieia MCP Server")
+    async def _run_tool(self, name, arguments):
+        """Run a tool, serializing a dict result with the output encoder instead of FastMCP's indented JSON."""
+        tool = self._tool_manager.get_tool(name)
+        if tool is None or tool.output_schema is not None:
+            return await super().call_tool(name, arguments)
+        result = await tool.run(arguments, context=self.get_context())
+        if not isinstance(result, dict):
+            return tool.fn_metadata.convert_result(result)
+        return [TextContent(type="text", text=self._encode("tool", name, result, encoder.max_bytes))]
+
+    async def _read_resource(self, uri, name):
+        """Read a resource, serializing its result with the output encoder (no size cap)."""
+        resource = await self._resource_manager.get_resource(uri, context=self.get_context())
+        if not isinstance(resource, FunctionResource):
+            return await super().read_resource(uri)
+        try:
+            result = resource.fn()
+            if inspect.iscoroutine(result):
+                result = await result
+        except Exception as e:
+            logging.exception(f"Error reading resource {uri}")
+            raise ResourceError(f"Error reading resource {uri}: {e}")
+        if not isinstance(result, (str, bytes)):
+            result = self._encode("resource", name, result)
+        return [ReadResourceContents(content=result, mime_type=resource.mime_type, meta=resource.meta)]
+
+    def seal_catalog(self):
+        """Report a hash of the tool and resource catalog as the server version.
+
+        Clients key their on-disk catalog cache on it, so call this after every
+        tool and resource is registered.
+        """
+        catalog = {
+            "tools": [(t.name, t.description, t.parameters) for t in self._tool_manager.list_tools()],
+            "resources": [(str(r.uri), r.description) for r in self._resource_manager.list_resources()],
+            "templates": [(t.uri_template, t.description) for t in self._resource_manager.list_templates()],
+        }
+        digest = hashlib.sha1(json.dumps(catalog, sort_keys=True, default=str).encode()).hexdigest()
+        self._mcp_server.version = f"catalog-{digest[:12]}"
+
+    async def call_tool(self, name, arguments):
+        return await self._observed(
+            "tool", name, self._run_tool(name, arguments),
+            ToolError(f"Tool {name} exceeded its {TOOL_DEADLINE}s deadline"),
+            (arguments or {}).get("patient_id"))
+
+    async def read_resource(self, uri):
+        name, params = self._resource_match(uri)
+        patient_id = split_resource_query(params["patient_id"])[0] if "patient_id" in params else None
+        return await self._observed(
+            "resource", name, self._read_resource(uri, name),
+            ResourceError(f"Resource {uri} exceeded its {TOOL_DEADLINE}s deadline"), patient_id)
+
+
+tracer = Tracer("mcp-server")
+# Compact JSON (orjson when installed) for every result; tool results are capped at MCP_OUTPUT_MAX_BYTES
+encoder = OutputEncoder()
+mcp = HygieiaMCP("Hygieia MCP Server", host=MCP_HOST, port=MCP_PORT, stateless_http=MCP_STATELESS_HTTP)
 
 # API Gateway base URL
 API_GATEWAY_BASE_URL = os.getenv('API_GATEWAY_URL', 'http://localhost:4000')
 
+# Shared keep-alive connection pool used by every tool and resource
+gateway = GatewayClient(API_GATEWAY_BASE_URL)
+
+# Read-mostly resources (doctors, all appointments, medical records) are served from here
+# until their TTL runs out or a write tool touches the same patient
+cache = ResponseCache()
+
+# Pending appointments, lab tests, prescriptions and today's medicines of each
+# patient seen so far, prefetched together and revalidated with conditional GETs
+patient_context = PatientContextStore(gateway)
+
+# Writes go ahead of reads, and reads ahead of multi-patient reads, when calls have to queue
+WRITE_TOOLS = {
+    "book_appointment", "reschedule_appointment", "cancel_appointment", "book_lab_test", "cancel_lab_test",
+    "batch_book_appointments", "batch_reschedule_appointments", "batch_cancel_appointments", "batch_cancel_lab_tests",
+}
+BULK_TOOLS = {"view_pending_items"}
+
+# Global concurrency limit, bounded priority queue and per-tool/per-patient rate limits
+admission = AdmissionController(
+    priority=lambda name: PRIORITY_WRITE if name in WRITE_TOOLS else PRIORITY_BULK if name in BULK_TOOLS else PRIORITY_READ
+)
+
+# Recent write results, so a re-emitted write tool call is not sent to the gateway twice
+idempotency = IdempotencyStore()
+
+# Local BM25 index of each patient's medical records, persisted under MCP_INDEX_DIR
+records_index = RecordsIndex()
+RETRIEVAL_TOP_K = int(os.getenv("MCP_RETRIEVAL_TOP_K", "5"))
+
+# Batch tools run at most this many gateway calls at once
+BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", "8"))
+MAX_BATCH_SIZE = int(os.getenv("MCP_MAX_BATCH_SIZE", "500"))
+BATCH_TOOLS = {
+    "batch_book_appointments", "batch_reschedule_appointments", "batch_cancel_appointments", "batch_cancel_lab_tests",
+    "view_pending_items",
+}
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
     handlers=[logging.StreamHandler()]
 )
 
+# ---------------- HELPERS ----------------
+
+def invalidate_cached(kind, patient_id=None):
+    """Drop cached reads made stale by a write; without a patient id every entry of that kind goes."""
+    if patient_id:
+        cache.invalidate(kind, str(patient_id))
+    else:
+        cache.invalidate(kind, all_keys=True)
+    patient_context.mark_stale(kind, patient_id)
+
+def patient_id_of(response):
+    """Best-effort patientId from a gateway write response, e.g. the updated appointment."""
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if isinstance(body, dict) and isinstance(body.get("data"), dict):
+        body = body["data"]
+    return body.get("patientId") if isinstance(body, dict) else None
+
+def created_id(result):
+    """Id of the record a successful create returned, e.g. the new appointment."""
+    body = result.get("data")
+    if isinstance(body, dict) and isinstance(body.get("data"), dict):
+        body = body["data"]
+    if isinstance(body, dict):
+        for name in ("id", "_id"):
+            if body.get(name) is not None:
+                return str(body[name])
+    return None
+
+def written_entity(kind, id_argument=None):
+    """Idempotency entity of a write: the id it was given, or else the id it created."""
+    def entity(arguments, result):
+        entity_id = arguments.get(id_argument) if id_argument else created_id(result)
+        return (kind, str(entity_id)) if entity_id is not None else None
+    return entity
+
+async def fetch_care_team():
+    """Fetch nutritionists and doctors in parallel; a failed source comes back empty and is listed in `errors`."""
+    cached = cache.get("doctors")
+    if cached is not None:
+        return cached
+
+    data, errors = await fan_out({
+        "nutritionists": gateway.aget("/nutritionists"),
+        "doctors": gateway.aget("/doctors"),
+    })
+    for name, error in errors.items():
+        logging.warning(f"Failed to fetch {name}: {error}")
+
+    result = {
+        "nutritionists": data.get("nutritionists", []),
+        "doctors": data.get("doctors", []),
+    }
+    if errors:
+        result["errors"] = errors
+    else:
+        cache.set("doctors", None, result)
+    return result
+
+async def run_batch(items, call):
+    """Run `call` on every item with bounded concurrency and collect per-item results in input order.
+
+    Each item gets MCP_TOOL_DEADLINE from when it starts; one that runs out fails on its own.
+    """
+    if not isinstance(items, list):
+        return {"success": False, "error": "Expected a list of items"}
+    if len(items) > MAX_BATCH_SIZE:
+        return {"success": False, "error": f"Batch of {len(items)} items exceeds the limit of {MAX_BATCH_SIZE}"}
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(item):
+        async with semaphore:
+            try:
+                with deadline_scope(TOOL_DEADLINE):
+                    return await asyncio.wait_for(call(item), TOOL_DEADLINE)
+            except asyncio.TimeoutError:
+                return {"success": False, "error": f"Item exceeded its {TOOL_DEADLINE}s deadline; a write may still have been applied"}
+            except KeyError as e:
+                return {"success": False, "error": f"Missing field {e}"}
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+
+    results = await asyncio.gather(*(run(item) for item in items))
+    succeeded = sum(1 for result in results if result.get("success"))
+    return {
+        "success": succeeded == len(items),
+        "total": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": [{"item": item, **result} for item, result in zip(items, results)],
+    }
+
 # ---------------- TOOLS ----------------
 
 @mcp.tool(description="Book a new appointment")
-def book_appointment(patient_id, doctor_id, date, time):
+@idempotency.idempotent("book_appointment", entity=written_entity("appointment"))
+async def book_appointment(patient_id, doctor_id, date, time):
     logging.info(f"Function called: book_appointment(patient_id={patient_id}, doctor_id={doctor_id}, date={date}, time={time})")
     
     try:
@@ -34,13 +359,14 @@ def book_appointment(patient_id, doctor_id, date, time):
         }
         
         # Make HTTP request to API Gateway
-        response = requests.post(
-            f"{API_GATEWAY_BASE_URL}/appointments",
+        response = await gateway.apost(
+            "/appointments",
             json=appointment_data,
             headers={"Content-Type": "application/json"}
         )
         
         if response.status_code == 201:
+            invalidate_cached("appointments", patient_id)
             return {"success": True, "data": response.json(), "message": "Appointment booked successfully"}
         else:
             return {"success": False, "error": response.text, "status_code": response.status_code}
@@ -50,7 +376,8 @@ def book_appointment(patient_id, doctor_id, date, time):
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="Reschedule an existing appointment")
-def reschedule_appointment(appointment_id, new_date, new_time):
+@idempotency.idempotent("reschedule_appointment", entity=written_entity("appointment", "appointment_id"))
+async def reschedule_appointment(appointment_id, new_date, new_time):
     logging.info(f"Function called: reschedule_appointment(appointment_id={appointment_id}, new_date={new_date}, new_time={new_time})")
     
     try:
@@ -62,13 +389,15 @@ def reschedule_appointment(appointment_id, new_date, new_time):
         }
         
         # Make HTTP request to API Gateway
-        response = requests.patch(
-            f"{API_GATEWAY_BASE_URL}/appointments/{appointment_id}",
+        response = await gateway.apatch(
+            "/appointments/{appointment_id}",
+            {"appointment_id": appointment_id},
             json=update_data,
             headers={"Content-Type": "application/json"}
         )
         
         if response.status_code == 200:
+            invalidate_cached("appointments", patient_id_of(response))
             return {"success": True, "data": response.json(), "message": "Appointment rescheduled successfully"}
         else:
             return {"success": False, "error": response.text, "status_code": response.status_code}
@@ -78,14 +407,16 @@ def reschedule_appointment(appointment_id, new_date, new_time):
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="Cancel an appointment")
-def cancel_appointment(appointment_id):
+@idempotency.idempotent("cancel_appointment", entity=written_entity("appointment", "appointment_id"))
+async def cancel_appointment(appointment_id):
     logging.info(f"Function called: cancel_appointment(appointment_id={appointment_id})")
     
     try:
         # Make HTTP request to API Gateway
-        response = requests.delete(f"{API_GATEWAY_BASE_URL}/appointments/{appointment_id}")
+        response = await gateway.adelete("/appointments/{appointment_id}", {"appointment_id": appointment_id})
         
         if response.status_code == 200:
+            invalidate_cached("appointments", patient_id_of(response))
             return {"success": True, "message": "Appointment cancelled successfully"}
         else:
             return {"success": False, "error": response.text, "status_code": response.status_code}
@@ -94,48 +425,64 @@ def cancel_appointment(appointment_id):
         logging.error(f"Error cancelling appointment: {str(e)}")
         return {"success": False, "error": str(e)}
 
-@mcp.tool(description="Ask a question from medical records")
-def question_from_medical_records(patient_id, question):
+@mcp.tool(description=(
+    "Ask a question from medical records. Returns the record excerpts most relevant to the question. "
+    "Optional: fields (comma-separated, of each excerpt's record_id, chunk, score, date, title, text; "
+    "when no excerpt matches, whole records are returned and fields picks from theirs), "
+    "date_from/date_to (YYYY-MM-DD), cursor and limit (default 5)"
+))
+async def question_from_medical_records(patient_id, question, fields=None, date_from=None, date_to=None, cursor=None, limit=None):
     logging.info(f"Function called: question_from_medical_records(patient_id={patient_id}, question={question})")
     
     try:
         # First get the patient's medical records
-        response = requests.get(f"{API_GATEWAY_BASE_URL}/medical-records/patient/{patient_id}")
-        
-        if response.status_code == 200:
+        medical_records = cache.get("medical_records", str(patient_id))
+        if medical_records is None:
+            response = await gateway.aget("/medical-records/patient/{patient_id}", {"patient_id": patient_id})
+            if response.status_code != 200:
+                return {"success": False, "error": response.text, "status_code": response.status_code}
             medical_records = response.json()
-            # Here you would typically process the question with AI/LLM
-            # For now, return the records with the question
-            return {
-                "success": True, 
-                "question": question,
-                "medical_records": medical_records,
-                "message": "Medical records retrieved. Question processing would require AI integration."
-            }
+            cache.set("medical_records", str(patient_id), medical_records)
+
+        # Only records that changed since the last question are re-indexed
+        changes = await asyncio.to_thread(records_index.sync, str(patient_id), items_of(medical_records) or [])
+        hits = await asyncio.to_thread(records_index.search, str(patient_id), question)
+        if hits:
+            excerpts, page = paginate(hits, fields, date_from, date_to, cursor, limit or RETRIEVAL_TOP_K)
+            message = "Most relevant medical record excerpts for the question."
         else:
-            return {"success": False, "error": response.text, "status_code": response.status_code}
+            excerpts, page = paginate(medical_records, fields, date_from, date_to, cursor, limit or RETRIEVAL_TOP_K)
+            message = "No record matched the question's terms; returning the first records instead."
+
+        logging.info(f"Records index for patient {patient_id}: {changes}")
+        return {
+            "success": True, 
+            "question": question,
+            "medical_records": excerpts,
+            **page,
+            "message": message
+        }
             
     except Exception as e:
         logging.error(f"Error retrieving medical records: {str(e)}")
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="View all prescriptions for a patient")
-def view_all_prescriptions(patient_id):
+async def view_all_prescriptions(patient_id):
     logging.info(f"Function called: view_all_prescriptions(patient_id={patient_id})")
     
     try:
         # Note: This route doesn't exist yet in API Gateway
         # We'll need to create it or use a placeholder
-        response = requests.get(f"{API_GATEWAY_BASE_URL}/prescriptions/patient/{patient_id}")
+        status_code, prescriptions = await patient_context.read(patient_id, "prescriptions")
         
-        if response.status_code == 200:
-            prescriptions = response.json()
+        if status_code == 200:
             return {"success": True, "prescriptions": prescriptions}
         else:
             return {
                 "success": False, 
                 "error": "Prescriptions route not implemented yet", 
-                "status_code": response.status_code,
+                "status_code": status_code,
                 "message": "This feature requires implementing prescriptions endpoint in API Gateway"
             }
             
@@ -144,7 +491,8 @@ def view_all_prescriptions(patient_id):
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="Book a lab test")
-def book_lab_test(patient_id, test_name, date):
+@idempotency.idempotent("book_lab_test", entity=written_entity("labtest"))
+async def book_lab_test(patient_id, test_name, date):
     logging.info(f"Function called: book_lab_test(patient_id={patient_id}, test_name={test_name}, date={date})")
     
     try:
@@ -159,13 +507,14 @@ def book_lab_test(patient_id, test_name, date):
         }
         
         # Make HTTP request to API Gateway
-        response = requests.post(
-            f"{API_GATEWAY_BASE_URL}/booked-lab-tests",
+        response = await gateway.apost(
+            "/booked-lab-tests",
             json=booking_data,
             headers={"Content-Type": "application/json"}
         )
         
         if response.status_code == 201:
+            invalidate_cached("labtests", patient_id)
             return {"success": True, "data": response.json(), "message": "Lab test booked successfully"}
         else:
             return {"success": False, "error": response.text, "status_code": response.status_code}
@@ -175,14 +524,16 @@ def book_lab_test(patient_id, test_name, date):
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="Cancel a lab test")
-def cancel_lab_test(test_id):
+@idempotency.idempotent("cancel_lab_test", entity=written_entity("labtest", "test_id"))
+async def cancel_lab_test(test_id):
     logging.info(f"Function called: cancel_lab_test(test_id={test_id})")
     
     try:
         # Make HTTP request to API Gateway
-        response = requests.patch(f"{API_GATEWAY_BASE_URL}/booked-lab-tests/{test_id}/cancel")
+        response = await gateway.apatch("/booked-lab-tests/{test_id}/cancel", {"test_id": test_id})
         
         if response.status_code == 200:
+            invalidate_cached("labtests", patient_id_of(response))
             return {"success": True, "message": "Lab test cancelled successfully"}
         else:
             return {"success": False, "error": response.text, "status_code": response.status_code}
@@ -192,29 +543,17 @@ def cancel_lab_test(test_id):
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="List all doctors and nutritionists")
-def list_doctors_and_nutritionists():
+async def list_doctors_and_nutritionists():
     logging.info("Function called: list_doctors_and_nutritionists()")
     
     try:
-        # Get nutritionists from existing endpoint
-        nutritionists_response = requests.get(f"{API_GATEWAY_BASE_URL}/nutritionists")
-        
-        # Get doctors from new endpoint
-        doctors_response = requests.get(f"{API_GATEWAY_BASE_URL}/doctors")
-        
-        nutritionists = []
-        doctors = []
-        
-        if nutritionists_response.status_code == 200:
-            nutritionists = nutritionists_response.json()
-        
-        if doctors_response.status_code == 200:
-            doctors = doctors_response.json()
-        
+        care_team = await fetch_care_team()
+        if len(care_team.get("errors", {})) == 2:
+            return {"success": False, "error": care_team["errors"]}
+
         return {
             "success": True, 
-            "nutritionists": nutritionists,
-            "doctors": doctors,
+            **care_team,
             "message": "Doctors and nutritionists retrieved successfully."
         }
             
@@ -222,62 +561,60 @@ def list_doctors_and_nutritionists():
         logging.error(f"Error retrieving doctors and nutritionists: {str(e)}")
         return {"success": False, "error": str(e)}
 
-@mcp.tool(description="View all pending appointments for a patient")
-def view_pending_appointments(patient_id):
+@mcp.tool(description=(
+    "View all pending appointments for a patient. Optional: fields (comma-separated), "
+    "date_from/date_to (YYYY-MM-DD), cursor and limit to page through the results"
+))
+async def view_pending_appointments(patient_id, fields=None, date_from=None, date_to=None, cursor=None, limit=None):
     logging.info(f"Function called: view_pending_appointments(patient_id={patient_id})")
     
     try:
         # Get appointments for patient with pending status
-        response = requests.get(
-            f"{API_GATEWAY_BASE_URL}/appointments/patient",
-            params={"patientId": patient_id, "status": "SCHEDULED"}
-        )
+        status_code, appointments = await patient_context.read(patient_id, "appointments")
         
-        if response.status_code == 200:
-            appointments = response.json()
-            return {"success": True, "appointments": appointments}
+        if status_code == 200:
+            appointments, page = paginate(appointments, fields, date_from, date_to, cursor, limit)
+            return {"success": True, "appointments": appointments, **page}
         else:
-            return {"success": False, "error": response.text, "status_code": response.status_code}
+            return {"success": False, "error": appointments, "status_code": status_code}
             
     except Exception as e:
         logging.error(f"Error retrieving pending appointments: {str(e)}")
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="View all pending lab tests for a patient")
-def view_pending_lab_tests(patient_id):
+async def view_pending_lab_tests(patient_id):
     logging.info(f"Function called: view_pending_lab_tests(patient_id={patient_id})")
     
     try:
         # Get lab test bookings for patient
-        response = requests.get(f"{API_GATEWAY_BASE_URL}/booked-lab-tests/patient/{patient_id}")
+        status_code, lab_tests = await patient_context.read(patient_id, "labtests")
         
-        if response.status_code == 200:
-            lab_tests = response.json()
+        if status_code == 200:
             return {"success": True, "lab_tests": lab_tests}
         else:
-            return {"success": False, "error": response.text, "status_code": response.status_code}
+            return {"success": False, "error": lab_tests, "status_code": status_code}
             
     except Exception as e:
         logging.error(f"Error retrieving pending lab tests: {str(e)}")
         return {"success": False, "error": str(e)}
 
 @mcp.tool(description="View today's medicines for a patient")
-def todays_medicine(patient_id):
+async def todays_medicine(patient_id):
     logging.info(f"Function called: todays_medicine(patient_id={patient_id})")
     
     try:
         # Note: This route doesn't exist yet in API Gateway
         # We'll need to create it or use a placeholder
-        response = requests.get(f"{API_GATEWAY_BASE_URL}/medicines/today/{patient_id}")
+        status_code, medicines = await patient_context.read(patient_id, "medicines")
         
-        if response.status_code == 200:
-            medicines = response.json()
+        if status_code == 200:
             return {"success": True, "medicines": medicines}
         else:
             return {
                 "success": False, 
                 "error": "Today's medicines route not implemented yet", 
-                "status_code": response.status_code,
+                "status_code": status_code,
                 "message": "This feature requires implementing medicines endpoint in API Gateway"
             }
             
@@ -286,37 +623,96 @@ def todays_medicine(patient_id):
         return {"success": False, "error": str(e)}
 
 
+# ---------------- BATCH TOOLS ----------------
+
+@mcp.tool(description=(
+    "Book several appointments in one call. "
+    "appointments: list of {patient_id, doctor_id, date, time}. Returns a result per item"
+))
+async def batch_book_appointments(appointments: list[dict]):
+    logging.info(f"Function called: batch_book_appointments({len(appointments)} items)")
+    return await run_batch(appointments, lambda item: book_appointment(
+        item["patient_id"], item["doctor_id"], item["date"], item["time"]
+    ))
+
+@mcp.tool(description=(
+    "Reschedule several appointments in one call. "
+    "reschedules: list of {appointment_id, new_date, new_time}. Returns a result per item"
+))
+async def batch_reschedule_appointments(reschedules: list[dict]):
+    logging.info(f"Function called: batch_reschedule_appointments({len(reschedules)} items)")
+    return await run_batch(reschedules, lambda item: reschedule_appointment(
+        item["appointment_id"], item["new_date"], item["new_time"]
+    ))
+
+@mcp.tool(description="Cancel several appointments in one call. Returns a result per appointment id")
+async def batch_cancel_appointments(appointment_ids: list[str]):
+    logging.info(f"Function called: batch_cancel_appointments({len(appointment_ids)} items)")
+    return await run_batch(appointment_ids, cancel_appointment)
+
+@mcp.tool(description="Cancel several lab tests in one call. Returns a result per test id")
+async def batch_cancel_lab_tests(test_ids: list[str]):
+    logging.info(f"Function called: batch_cancel_lab_tests({len(test_ids)} items)")
+    return await run_batch(test_ids, cancel_lab_test)
+
+@mcp.tool(description="View pending appointments and lab tests for several patients in one call")
+async def view_pending_items(patient_ids: list[str]):
+    logging.info(f"Function called: view_pending_items({len(patient_ids)} patients)")
+
+    async def pending_for(patient_id):
+        appointments, lab_tests = await asyncio.gather(
+            view_pending_appointments(patient_id), view_pending_lab_tests(patient_id)
+        )
+        result = {
+            "success": appointments.get("success", False) and lab_tests.get("success", False),
+            "appointments": appointments.get("appointments", []),
+            "lab_tests": lab_tests.get("lab_tests", []),
+        }
+        errors = [r["error"] for r in (appointments, lab_tests) if "error" in r]
+        if errors:
+            result["errors"] = errors
+        return result
+
+    return await run_batch(patient_ids, pending_for)
+
 # ---------------- RESOURCES ----------------
 
-@mcp.resource("resource://appointments/{patient_id}", description="All appointments of a patient")
-def appointments_resource(patient_id: str):
+@mcp.resource(
+    "resource://appointments/{patient_id}",
+    description="All appointments of a patient (append ?fields=&date_from=&date_to=&cursor=&limit= to page)"
+)
+async def appointments_resource(patient_id: str):
+    patient_id, options = split_resource_query(patient_id)
     logging.info(f"Resource requested: appointments for patient {patient_id}")
     
     try:
-        response = requests.get(
-            f"{API_GATEWAY_BASE_URL}/appointments/patient",
-            params={"patientId": patient_id}
-        )
-        
-        if response.status_code == 200:
+        appointments = cache.get("appointments", patient_id)
+        if appointments is None:
+            generation = cache.generation("appointments", patient_id)
+            response = await gateway.aget(
+                "/appointments/patient",
+                params={"patientId": patient_id}
+            )
+            if response.status_code != 200:
+                return {"error": f"Failed to fetch appointments: {response.text}"}
             appointments = response.json()
-            return {"appointments": appointments}
-        else:
-            return {"error": f"Failed to fetch appointments: {response.text}"}
+            cache.set("appointments", patient_id, appointments, generation)
+
+        appointments, page = paginate(appointments, **options)
+        return {"appointments": appointments, **page}
             
     except Exception as e:
         logging.error(f"Error fetching appointments resource: {str(e)}")
         return {"error": str(e)}
 
 @mcp.resource("resource://prescriptions/{patient_id}", description="All prescriptions of a patient")
-def prescriptions_resource(patient_id: str):
+async def prescriptions_resource(patient_id: str):
     logging.info(f"Resource requested: prescriptions for patient {patient_id}")
     
     try:
-        response = requests.get(f"{API_GATEWAY_BASE_URL}/prescriptions/patient/{patient_id}")
+        status_code, prescriptions = await patient_context.read(patient_id, "prescriptions")
         
-        if response.status_code == 200:
-            prescriptions = response.json()
+        if status_code == 200:
             return {"prescriptions": prescriptions}
         else:
             return {"error": "Prescriptions endpoint not implemented yet", "message": "This resource requires implementing prescriptions endpoint in API Gateway"}
@@ -325,46 +721,37 @@ def prescriptions_resource(patient_id: str):
         logging.error(f"Error fetching prescriptions resource: {str(e)}")
         return {"error": str(e)}
 
-@mcp.resource("resource://labtests/{patient_id}", description="All lab tests of a patient")
-def labtests_resource(patient_id: str):
+@mcp.resource(
+    "resource://labtests/{patient_id}",
+    description="All lab tests of a patient (append ?fields=&date_from=&date_to=&cursor=&limit= to page)"
+)
+async def labtests_resource(patient_id: str):
+    patient_id, options = split_resource_query(patient_id)
     logging.info(f"Resource requested: lab tests for patient {patient_id}")
     
     try:
-        response = requests.get(f"{API_GATEWAY_BASE_URL}/booked-lab-tests/patient/{patient_id}")
-        
-        if response.status_code == 200:
-            lab_tests = response.json()
-            return {"labtests": lab_tests}
-        else:
-            return {"error": f"Failed to fetch lab tests: {response.text}"}
+        status_code, lab_tests = await patient_context.read(patient_id, "labtests")
+        if status_code != 200:
+            return {"error": f"Failed to fetch lab tests: {lab_tests}"}
+
+        lab_tests, page = paginate(lab_tests, **options)
+        return {"labtests": lab_tests, **page}
             
     except Exception as e:
         logging.error(f"Error fetching lab tests resource: {str(e)}")
         return {"error": str(e)}
 
 @mcp.resource("resource://doctors", description="List of all doctors and nutritionists")
-def doctors_resource():
+async def doctors_resource():
     logging.info("Resource requested: doctors and nutritionists list")
     
     try:
-        # Get nutritionists from existing endpoint
-        nutritionists_response = requests.get(f"{API_GATEWAY_BASE_URL}/nutritionists")
-        
-        # Get doctors from new endpoint
-        doctors_response = requests.get(f"{API_GATEWAY_BASE_URL}/doctors")
-        
-        nutritionists = []
-        doctors = []
-        
-        if nutritionists_response.status_code == 200:
-            nutritionists = nutritionists_response.json()
-        
-        if doctors_response.status_code == 200:
-            doctors = doctors_response.json()
-        
+        care_team = await fetch_care_team()
+        if len(care_team.get("errors", {})) == 2:
+            return {"error": care_team["errors"]}
+
         return {
-            "doctors": doctors,
-            "nutritionists": nutritionists,
+            **care_team,
             "message": "Doctors and nutritionists retrieved successfully."
         }
             
@@ -373,14 +760,13 @@ def doctors_resource():
         return {"error": str(e)}
 
 @mcp.resource("resource://todays-medicine/{patient_id}", description="Today's medicines for a patient")
-def todays_medicine_resource(patient_id: str):
+async def todays_medicine_resource(patient_id: str):
     logging.info(f"Resource requested: today's medicines for patient {patient_id}")
     
     try:
-        response = requests.get(f"{API_GATEWAY_BASE_URL}/medicines/today/{patient_id}")
+        status_code, medicines = await patient_context.read(patient_id, "medicines")
         
-        if response.status_code == 200:
-            medicines = response.json()
+        if status_code == 200:
             return {"todays_medicine": medicines}
         else:
             return {"error": "Today's medicines endpoint not implemented yet", "message": "This resource requires implementing medicines endpoint in API Gateway"}
@@ -389,7 +775,131 @@ def todays_medicine_resource(patient_id: str):
         logging.error(f"Error fetching today's medicine resource: {str(e)}")
         return {"error": str(e)}
 
+@mcp.resource("resource://metrics/gateway-pool", description="Connection pool metrics for the API gateway client")
+def gateway_pool_metrics_resource():
+    return gateway.pool_stats()
+
+@mcp.resource("resource://metrics/resilience", description="Retry counts and circuit breaker state per gateway route")
+def resilience_metrics_resource():
+    return gateway.resilience.stats()
+
+@mcp.resource("resource://metrics/idempotency", description="Replayed and joined duplicate write tool calls")
+def idempotency_metrics_resource():
+    return idempotency.stats()
+
+@mcp.resource("resource://metrics/cache", description="Hit/miss counters of the resource cache")
+def cache_metrics_resource():
+    return cache.stats()
+
+@mcp.resource("resource://metrics/admission", description="Active and queued calls, and calls shed by admission control")
+def admission_metrics_resource():
+    return admission.stats()
+
+@mcp.resource("resource://metrics/patient-context", description="Prefetches, snapshot hits and incremental refresh counters")
+def patient_context_metrics_resource():
+    return patient_context.stats()
+
+@mcp.resource("resource://metrics/snapshot", description="Per-tool and per-route latency histograms, call counts and byte totals")
+def metrics_snapshot_resource():
+    return REGISTRY.snapshot()
+
+
+# Component state published as gauges when /metrics is scraped
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+REGISTRY.gauge_callback(
+    "mcp_gateway_in_flight", "Gateway requests currently in flight",
+    lambda: {(): gateway.pool_stats()["in_flight"]})
+REGISTRY.gauge_callback(
+    "mcp_gateway_coalesced_total", "GET requests answered by an identical in-flight request",
+    lambda: {(): gateway.pool_stats()["coalesced"]})
+REGISTRY.gauge_callback(
+    "mcp_cache_hits_total", "Resource cache hits per kind",
+    lambda: {(("kind", kind),): s["hits"] for kind, s in cache.stats()["by_kind"].items()})
+REGISTRY.gauge_callback(
+    "mcp_cache_misses_total", "Resource cache misses per kind",
+    lambda: {(("kind", kind),): s["misses"] for kind, s in cache.stats()["by_kind"].items()})
+REGISTRY.gauge_callback(
+    "mcp_gateway_breaker_state", "Circuit breaker state per route (0 closed, 1 half open, 2 open)",
+    lambda: {(("route", route),): BREAKER_STATES[b["state"]] for route, b in gateway.resilience.stats()["breakers"].items()})
+REGISTRY.gauge_callback(
+    "mcp_gateway_retries_total", "Gateway request retries per route",
+    lambda: {(("route", route),): n for route, n in gateway.resilience.stats()["retries"].items()})
+REGISTRY.gauge_callback(
+    "mcp_admission_calls", "Calls holding a slot (active) and waiting for one (queued)",
+    lambda: {(("state", state),): admission.stats()[state] for state in ("active", "queued")})
+REGISTRY.gauge_callback(
+    "mcp_admission_shed_total", "Calls rejected by admission control per reason and priority class",
+    lambda: {(("reason", reason), ("priority", priority)): n
+             for reason, counts in admission.stats()["shed"].items() for priority, n in counts.items()})
+REGISTRY.gauge_callback(
+    "mcp_patient_context_total", "Patient snapshot prefetches, hits, gateway fetches and 304 revalidations",
+    lambda: {(("event", event),): patient_context.stats()[event] for event in ("prefetches", "hits", "fetches", "not_modified")})
+REGISTRY.gauge_callback(
+    "mcp_idempotent_replays_total", "Duplicate write tool calls answered without calling the gateway",
+    lambda: {(("mode", mode),): idempotency.stats()[mode] for mode in ("replayed", "joined")})
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request):
+    # Served by the HTTP transports; over stdio the standalone metrics server is used
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@mcp.custom_route("/metrics.json", methods=["GET"])
+async def metrics_json_endpoint(request):
+    return JSONResponse(REGISTRY.snapshot())
+
+
+# Every tool and resource is registered above this line
+mcp.seal_catalog()
+
+# Imports plus tool and resource registration; interpreter start-up comes on top
+STARTUP_SECONDS = time.perf_counter() - IMPORT_STARTED
+REGISTRY.gauge_callback(
+    "mcp_server_startup_seconds", "Time from the first import of mcp_server to a registered catalog",
+    lambda: {(): round(STARTUP_SECONDS, 4)})
+
+
+def create_app():
+    """Streamable HTTP app; the factory uvicorn workers import."""
+    return mcp.streamable_http_app()
+
+
+def serve_http(transport: str, workers: int):
+    import uvicorn
+
+    if transport == "sse" and workers > 1:
+        # An SSE session's stream and its posted messages must reach the same process
+        logging.warning("SSE transport runs a single worker; use streamable-http for several")
+        workers = 1
+    if transport == "sse":
+        uvicorn.run(mcp.sse_app(), host=MCP_HOST, port=MCP_PORT, log_level="warning")
+    elif workers > 1:
+        os.environ["MCP_STATELESS_HTTP"] = "1"  # read by each worker when it imports this module
+        uvicorn.run("mcp_server:create_app", factory=True, host=MCP_HOST, port=MCP_PORT,
+                    workers=workers, log_level="warning")
+    else:
+        uvicorn.run(create_app(), host=MCP_HOST, port=MCP_PORT, log_level="warning")
+
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
-    print("server started")
+    parser = argparse.ArgumentParser(description="Hygieia MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"],
+                        default=os.getenv("MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--workers", type=int, default=MCP_WORKERS)
+    args = parser.parse_args()
+    logging.info(f"mcp_server loaded in {STARTUP_SECONDS * 1000:.0f} ms")
+
+    if args.transport == "stdio":
+        metrics_port = int(os.getenv("MCP_METRICS_PORT", "4007"))
+        if metrics_port:
+            try:
+                start_metrics_server(metrics_port, host=MCP_HOST)
+            except OSError as e:
+                # Another server process spawned over stdio may already hold the port
+                logging.warning(f"Metrics endpoint not started on port {metrics_port}: {e}")
+        mcp.run(transport="stdio")
+        print("server started")
+    else:
+        serve_http(args.transport, args.workers)
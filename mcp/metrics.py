@@ -0,0 +1,200 @@
+import json
+import logging
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ENCODE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Name of the tool/resource being served, so gateway metrics can be labelled with it
+current_tool: ContextVar[str] = ContextVar("current_tool", default="")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labelnames: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.type = "counter"
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_label_str(self.labelnames, key)} {value}" for key, value in sorted(self._values.items())]
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [{**dict(zip(self.labelnames, key)), "value": value} for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.type = "histogram"
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, Dict] = {}  # labels -> {"counts": [...], "sum": x, "count": n}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0})
+            series["counts"][bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), series["counts"]):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {series['count']}")
+        return lines
+
+    def _quantile(self, series: Dict, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-quantile (None if it is in +Inf)."""
+        target, cumulative = q * series["count"], 0
+        for bound, count in zip(self.buckets, series["counts"]):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return None
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {
+                    **dict(zip(self.labelnames, key)),
+                    "count": series["count"],
+                    "sum": round(series["sum"], 6),
+                    "p50_le": self._quantile(series, 0.5),
+                    "p99_le": self._quantile(series, 0.99),
+                }
+                for key, series in sorted(self._series.items())
+            ]
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them as Prometheus text or a JSON-able snapshot.
+
+    Gauge callbacks let other components (connection pool, cache, breakers)
+    publish their current state at scrape time without duplicating counters.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, help: str, collect: Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]):
+        """`collect` returns {((label, value), ...): gauge value} when scraped."""
+        self._gauges.append((name, help, collect))
+
+    def _collect_gauges(self):
+        for name, help, collect in self._gauges:
+            try:
+                yield name, help, collect()
+            except Exception as e:
+                logging.warning(f"Metrics gauge {name} failed: {e}")
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        for name, help, samples in self._collect_gauges():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(samples.items()):
+                lines.append(f"{name}{_label_str(tuple(k for k, _ in labels), tuple(v for _, v in labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        result = {metric.name: metric.snapshot() for metric in self._metrics}
+        for name, _, samples in self._collect_gauges():
+            result[name] = [{**dict(labels), "value": value} for labels, value in sorted(samples.items())]
+        return result
+
+
+REGISTRY = MetricsRegistry()
+
+TOOL_LATENCY = REGISTRY.histogram(
+    "mcp_tool_duration_seconds", "Duration of MCP tool and resource calls", ("kind", "name"))
+TOOL_CALLS = REGISTRY.counter(
+    "mcp_tool_calls_total", "MCP tool and resource calls by outcome", ("kind", "name", "outcome"))
+TOOL_RESPONSE_BYTES = REGISTRY.histogram(
+    "mcp_tool_response_bytes", "Size of tool and resource results", ("kind", "name"), BYTES_BUCKETS)
+TOOL_ENCODE_SECONDS = REGISTRY.histogram(
+    "mcp_tool_encode_seconds", "Time spent serializing tool and resource results", ("kind", "name"), ENCODE_BUCKETS)
+TOOL_OUTPUTS_CAPPED = REGISTRY.counter(
+    "mcp_tool_outputs_capped_total", "Tool results whose long lists were shortened to fit the size cap", ("kind", "name"))
+GATEWAY_LATENCY = REGISTRY.histogram(
+    "mcp_gateway_request_duration_seconds", "Duration of API gateway requests", ("tool", "method", "route"))
+GATEWAY_RESPONSES = REGISTRY.counter(
+    "mcp_gateway_responses_total", "API gateway responses by status code", ("tool", "method", "route", "status"))
+GATEWAY_REQUEST_BYTES = REGISTRY.counter(
+    "mcp_gateway_request_bytes_total", "Bytes sent to the API gateway", ("tool", "method", "route"))
+GATEWAY_RESPONSE_BYTES = REGISTRY.counter(
+    "mcp_gateway_response_bytes_total", "Bytes received from the API gateway", ("tool", "method", "route"))
+
+
+def start_metrics_server(port: int, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.render_prometheus().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(registry.snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    logging.info(f"Metrics available on http://{host}:{port}/metrics")
+    return server
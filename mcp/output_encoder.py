@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+from typing import Any, Optional, Tuple
+
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # optional; `pip install orjson` for faster encoding
+    orjson = None
+
+# "auto" uses orjson when it is installed, else pydantic_core (a dependency of mcp);
+# "json" forces the standard library
+JSON_BACKEND = os.getenv("MCP_JSON_BACKEND", "auto")
+# 0 writes compact JSON; FastMCP's own default is 2
+OUTPUT_INDENT = int(os.getenv("MCP_OUTPUT_INDENT", "0"))
+# Tool results larger than this get their long lists shortened; 0 disables the cap.
+# The default matches what the client keeps of a tool output (MCP_MAX_TOOL_OUTPUT_TOKENS x 4 chars)
+OUTPUT_MAX_BYTES = int(os.getenv("MCP_OUTPUT_MAX_BYTES", "6000"))
+# What a batch entry is cut down to when even shortened payloads do not fit
+OUTLINE_FIELDS = ("item", "success", "error", "status_code", "errors")
+
+
+class OutputEncoder:
+    """Serializes tool and resource results to JSON text.
+
+    Compact separators and no ASCII escaping by default; orjson when available,
+    otherwise pydantic_core, which FastMCP itself uses.
+    encode() with a cap shortens the longest lists in a result until it fits,
+    leaving a "... N more items" marker where items were dropped, so the text
+    stays valid JSON instead of being cut off mid-way by the client. A page
+    from projection.paginate gets its `returned` and `next_cursor` rewritten
+    so the next page starts at the first dropped item. The per-item results of
+    a batch are never dropped: their payloads are shortened, and if that is not
+    enough each entry is cut down to its item and outcome.
+    """
+
+    def __init__(self, backend: str = JSON_BACKEND, indent: int = OUTPUT_INDENT, max_bytes: int = OUTPUT_MAX_BYTES):
+        if backend == "auto":
+            backend = "orjson" if orjson is not None else "pydantic"
+        if backend == "orjson" and orjson is None:
+            logging.warning("MCP_JSON_BACKEND=orjson but orjson is not installed; using pydantic")
+            backend = "pydantic"
+        self.backend = backend
+        self.indent = indent
+        self.max_bytes = max_bytes
+        if backend == "orjson":
+            self._options = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+
+    def dumps(self, value: Any) -> str:
+        if self.backend == "orjson":
+            return orjson.dumps(value, default=str, option=self._options).decode()
+        if self.backend == "pydantic":
+            return pydantic_core.to_json(value, fallback=str, indent=self.indent or None).decode()
+        if self.indent:
+            return json.dumps(value, indent=self.indent, ensure_ascii=False, default=str)
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    def encode(self, value: Any, max_bytes: Optional[int] = None) -> Tuple[str, bool]:
+        """(text, capped): `value` as JSON, with long lists shortened to stay under max_bytes."""
+        text = self.dumps(value)
+        if not max_bytes or len(text) <= max_bytes:
+            return text, False
+
+        keep = _longest_list(value) // 2
+        shortened = None
+        while keep >= 1:
+            shortened = self.dumps(_shorten(value, keep))
+            if len(shortened) <= max_bytes:
+                return shortened, True
+            keep //= 2
+        if _is_batch(value):
+            # Every item keeps its outcome, even when its payload has to go
+            return self.dumps(_outline(value)), True
+        if shortened is not None:
+            return shortened, True
+        # Nothing to shorten: the size is in scalars, which the client truncates
+        return text, False
+
+
+def _is_batch(value: Any) -> bool:
+    """Per-item results of mcp_server.run_batch, whose entries the cap must keep."""
+    return isinstance(value, dict) and isinstance(value.get("results"), list) and "succeeded" in value
+
+
+def _outline(batch: dict) -> dict:
+    """Copy of a batch result with each entry reduced to its item and outcome."""
+    return {
+        **batch,
+        "results": [
+            {k: entry[k] for k in OUTLINE_FIELDS if k in entry} if isinstance(entry, dict) else entry
+            for entry in batch["results"]
+        ],
+        "note": "Per-item details were dropped to fit the output size limit; query single items for them",
+    }
+
+
+def _longest_list(value: Any) -> int:
+    if _is_batch(value):
+        lengths = [_longest_list(v) for k, v in value.items() if k != "results"]
+        return max([*lengths, *(_longest_list(entry) for entry in value["results"])], default=0)
+    if isinstance(value, dict):
+        return max((_longest_list(v) for v in value.values()), default=0)
+    if isinstance(value, list):
+        return max(len(value), max((_longest_list(v) for v in value), default=0))
+    return 0
+
+
+def _shorten(value: Any, keep: int) -> Any:
+    """Copy of `value` with every list cut to its first `keep` items plus a marker."""
+    if _is_batch(value):
+        return {k: [_shorten(entry, keep) for entry in v] if k == "results" else _shorten(v, keep)
+                for k, v in value.items()}
+    if isinstance(value, dict):
+        shortened = {k: _shorten(v, keep) for k, v in value.items()}
+        _repaginate(value, shortened, keep)
+        return shortened
+    if isinstance(value, list):
+        items = [_shorten(v, keep) for v in value[:keep]]
+        if len(value) > keep:
+            items.append(f"... {len(value) - keep} more items")
+        return items
+    return value
+
+
+def _repaginate(value: dict, shortened: dict, keep: int):
+    """Point `returned`/`next_cursor` of a shortened page (see projection.paginate) at the first dropped item."""
+    returned = value.get("returned")
+    if not isinstance(returned, int) or returned <= keep or "next_cursor" not in value:
+        return
+    if not any(isinstance(v, list) and len(v) == returned for v in value.values()):
+        return
+    try:
+        end = int(value["next_cursor"]) if value["next_cursor"] is not None else int(value["total"])
+    except (KeyError, TypeError, ValueError):
+        return
+    shortened["returned"] = keep
+    shortened["next_cursor"] = str(end - returned + keep)
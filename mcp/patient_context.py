@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from metrics import current_tool
+from projection import items_of
+from resilience import deadline_scope
+
+# Seconds a snapshot is served without asking the gateway whether it changed
+SNAPSHOT_TTL = float(os.getenv("MCP_SNAPSHOT_TTL", "30"))
+MAX_PATIENTS = int(os.getenv("MCP_SNAPSHOT_MAX_PATIENTS", "256"))
+PREFETCH_DEADLINE = float(os.getenv("MCP_PREFETCH_DEADLINE", "20"))
+# Patients prefetched at once; reads made by tools never wait for this
+PREFETCH_CONCURRENCY = int(os.getenv("MCP_PREFETCH_CONCURRENCY", "4"))
+PREFETCH_ENABLED = os.getenv("MCP_PREFETCH", "1") == "1"
+
+# Per-patient reads that make up a working set: source -> (route, path params?, query params)
+SOURCES: Dict[str, Tuple[str, bool, Optional[Dict]]] = {
+    "appointments": ("/appointments/patient", False, {"status": "SCHEDULED"}),
+    "labtests": ("/booked-lab-tests/patient/{patient_id}", True, None),
+    "prescriptions": ("/prescriptions/patient/{patient_id}", True, None),
+    "medicines": ("/medicines/today/{patient_id}", True, None),
+}
+
+ID_FIELDS = ("id", "_id")
+VERSION_FIELDS = ("updatedAt", "updated_at")
+
+
+def _first(item: Any, names) -> Optional[Hashable]:
+    if isinstance(item, dict):
+        for name in names:
+            value = item.get(name)
+            if value is not None:
+                return str(value)
+    return None
+
+
+class Snapshot:
+    """One source of one patient's working set, as last confirmed by the gateway."""
+
+    __slots__ = ("payload", "items", "etag", "last_modified", "checked_at")
+
+    def __init__(self):
+        self.payload: Any = None
+        self.items: Dict[Hashable, Tuple[Optional[str], Any]] = {}  # item id -> (version, item)
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.checked_at = 0.0
+
+
+class PatientContextStore:
+    """Prefetched, incrementally refreshed snapshots of each patient's pending reads.
+
+    The first time a patient shows up, prefetch() loads every source in
+    SOURCES in parallel. Later reads are served from the snapshot until it is
+    SNAPSHOT_TTL old or a write marks it stale; then it is revalidated with
+    If-None-Match/If-Modified-Since. A 304 keeps the snapshot as is, and on a
+    200 only items whose id/updatedAt changed are replaced, so unchanged items
+    keep being shared. Snapshots hold decoded JSON and must be treated as read-only.
+
+    mark_stale() bumps a generation per (patient, source); a refresh that was
+    already in flight when that happened stores what it got as stale, so a
+    response that raced a write is never served as fresh.
+    """
+
+    def __init__(self, gateway, ttl: float = SNAPSHOT_TTL, max_patients: int = MAX_PATIENTS,
+                 prefetch_enabled: bool = PREFETCH_ENABLED, prefetch_concurrency: int = PREFETCH_CONCURRENCY):
+        self.gateway = gateway
+        self.ttl = ttl
+        self.max_patients = max_patients
+        self.prefetch_enabled = prefetch_enabled
+        self.prefetch_concurrency = prefetch_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+        self._patients: "OrderedDict[str, Dict[str, Snapshot]]" = OrderedDict()
+        self._refreshing: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._prefetching: Dict[str, asyncio.Task] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}  # (patient, source) -> writes seen
+        self._source_generations: Dict[str, int] = {}  # source -> writes to every patient
+        self._counts = {
+            "prefetches": 0, "hits": 0, "fetches": 0, "not_modified": 0,
+            "items_changed": 0, "items_reused": 0, "items_removed": 0, "evictions": 0,
+        }
+
+    def _snapshots(self, patient_id: str) -> Dict[str, Snapshot]:
+        snapshots = self._patients.get(patient_id)
+        if snapshots is None:
+            snapshots = self._patients[patient_id] = {}
+            while len(self._patients) > self.max_patients:
+                evicted, _ = self._patients.popitem(last=False)
+                for source in SOURCES:
+                    self._generations.pop((evicted, source), None)
+                self._counts["evictions"] += 1
+        self._patients.move_to_end(patient_id)
+        return snapshots
+
+    def prefetch(self, patient_id) -> Optional[asyncio.Task]:
+        """Start loading a patient's whole working set in the background, once per patient."""
+        if not self.prefetch_enabled or not patient_id or not isinstance(patient_id, (str, int)):
+            return None
+        patient_id = str(patient_id)
+        if patient_id in self._patients or patient_id in self._prefetching:
+            return self._prefetching.get(patient_id)
+        self._snapshots(patient_id)
+        self._counts["prefetches"] += 1
+        task = asyncio.ensure_future(self._prefetch(patient_id))
+        self._prefetching[patient_id] = task
+        task.add_done_callback(lambda _: self._prefetching.pop(patient_id, None))
+        return task
+
+    async def _prefetch(self, patient_id: str):
+        # Runs detached from the tool that triggered it: own label, own deadline
+        current_tool.set("prefetch")
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots, self._slots_loop = asyncio.Semaphore(self.prefetch_concurrency), loop
+        async with self._slots:
+            with deadline_scope(PREFETCH_DEADLINE):
+                # Sources a tool already fetched while this waited are snapshot hits here
+                results = await asyncio.gather(
+                    *(self.read(patient_id, source) for source in SOURCES), return_exceptions=True
+                )
+        for source, result in zip(SOURCES, results):
+            if isinstance(result, BaseException):
+                logging.warning(f"Prefetch of {source} for patient {patient_id} failed: {result}")
+
+    async def read(self, patient_id, source: str) -> Tuple[int, Any]:
+        """(200, payload) from a fresh or revalidated snapshot, else (status, error text) from the gateway."""
+        patient_id = str(patient_id)
+        snapshot = self._snapshots(patient_id).get(source)
+        if snapshot is not None and time.monotonic() - snapshot.checked_at < self.ttl:
+            self._counts["hits"] += 1
+            return 200, snapshot.payload
+
+        # A prefetch or another caller may already be refreshing this source
+        key = (patient_id, source)
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(patient_id, source))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda done: self._forget_refresh(key, done))
+        return await asyncio.shield(task)
+
+    def _forget_refresh(self, key: Tuple[str, str], task: asyncio.Task):
+        # mark_stale may already have replaced it with a newer refresh
+        if self._refreshing.get(key) is task:
+            del self._refreshing[key]
+
+    def _generation(self, patient_id: str, source: str) -> Tuple[int, int]:
+        return self._source_generations.get(source, 0), self._generations.get((patient_id, source), 0)
+
+    async def _refresh(self, patient_id: str, source: str) -> Tuple[int, Any]:
+        route, in_path, params = SOURCES[source]
+        generation = self._generation(patient_id, source)
+        snapshot = self._patients.get(patient_id, {}).get(source)
+        headers = {}
+        if snapshot is not None and snapshot.etag:
+            headers["If-None-Match"] = snapshot.etag
+        if snapshot is not None and snapshot.last_modified:
+            headers["If-Modified-Since"] = snapshot.last_modified
+
+        response = await self.gateway.aget(
+            route,
+            {"patient_id": patient_id} if in_path else None,
+            params={"patientId": patient_id, **params} if params is not None else None,
+            headers=headers or None,
+        )
+        self._counts["fetches"] += 1
+        # A write since the request went out may not be in the response: keep it, but revalidate on the next read
+        checked_at = time.monotonic() if self._generation(patient_id, source) == generation else 0.0
+
+        if response.status_code == 304 and snapshot is not None:
+            self._counts["not_modified"] += 1
+            snapshot.checked_at = checked_at
+            return 200, snapshot.payload
+        if response.status_code != 200:
+            return response.status_code, response.text
+
+        payload = response.json()
+        fresh = Snapshot()
+        fresh.payload = self._merge(snapshot, payload, fresh.items)
+        fresh.etag = response.headers.get("ETag")
+        fresh.last_modified = response.headers.get("Last-Modified")
+        fresh.checked_at = checked_at
+        # The patient may have been evicted or cleared while the request was out
+        self._snapshots(patient_id)[source] = fresh
+        return 200, fresh.payload
+
+    def _merge(self, previous: Optional[Snapshot], payload: Any, index: Dict) -> Any:
+        """Reuse items of the previous snapshot that did not change; fill `index` for the next merge."""
+        items = items_of(payload)
+        if items is None:
+            return payload
+
+        old = previous.items if previous is not None else {}
+        merged = []
+        for item in items:
+            item_id = _first(item, ID_FIELDS)
+            version = _first(item, VERSION_FIELDS)
+            known = old.get(item_id) if item_id is not None else None
+            if known is not None and (known[0] == version if version is not None else known[1] == item):
+                item = known[1]
+                self._counts["items_reused"] += 1
+            else:
+                self._counts["items_changed"] += 1
+            if item_id is not None:
+                index[item_id] = (version, item)
+            merged.append(item)
+        self._counts["items_removed"] += len(old.keys() - index.keys())
+        return {**payload, "data": merged} if isinstance(payload, dict) else merged
+
+    def mark_stale(self, source: str, patient_id=None):
+        """Make the next read revalidate; without a patient id every patient's `source` is affected."""
+        if patient_id:
+            key = (str(patient_id), source)
+            if key[0] in self._patients or key in self._refreshing:
+                # Only a refresh already in flight can be out of date
+                self._generations[key] = self._generations.get(key, 0) + 1
+            targets = [self._patients.get(str(patient_id), {})]
+        else:
+            self._source_generations[source] = self._source_generations.get(source, 0) + 1
+            targets = list(self._patients.values())
+        # Reads after the write must not join a refresh that started before it
+        for key in [k for k in self._refreshing if k[1] == source and (not patient_id or k[0] == str(patient_id))]:
+            del self._refreshing[key]
+        for snapshots in targets:
+            if source in snapshots:
+                snapshots[source].checked_at = 0.0
+
+    def clear(self):
+        self._patients.clear()
+        self._generations.clear()
+        self._source_generations.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "patients": len(self._patients),
+            "max_patients": self.max_patients,
+            "ttl": self.ttl,
+            "prefetching": len(self._prefetching),
+            **self._counts,
+        }
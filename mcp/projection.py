@@ -0,0 +1,78 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+DEFAULT_PAGE_SIZE = int(os.getenv("MCP_DEFAULT_PAGE_SIZE", "50"))
+
+# Options accepted by paginate(), also as a query string on resource URIs
+PAGE_OPTIONS = ("fields", "date_from", "date_to", "cursor", "limit")
+
+# Services name their date columns differently; the first one present is used
+DATE_FIELDS = ("date", "appointmentDate", "appointment_date", "scheduledDate", "scheduled_date", "createdAt", "created_at")
+
+
+def parse_fields(fields) -> Optional[List[str]]:
+    """Accept "id,date" or ["id", "date"]; None/empty means all fields."""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [f.strip() for f in fields if f.strip()] or None
+
+
+def item_date(item: Dict) -> Optional[str]:
+    for name in DATE_FIELDS:
+        if item.get(name):
+            return str(item[name])[:10]
+    return None
+
+
+def items_of(payload: Any) -> Optional[List]:
+    """The list inside a gateway payload (bare list or {"data": [...]}), else None."""
+    if isinstance(payload, dict) and isinstance(payload.get("data"), list):
+        return payload["data"]
+    return payload if isinstance(payload, list) else None
+
+
+def split_resource_query(value: str) -> Tuple[str, Dict[str, str]]:
+    """Split "p1?fields=id,date&limit=10" from a resource URI segment into ("p1", options)."""
+    value, _, query = value.partition("?")
+    return value, {k: v[-1] for k, v in parse_qs(query).items() if k in PAGE_OPTIONS}
+
+
+def paginate(payload: Any, fields=None, date_from: Optional[str] = None, date_to: Optional[str] = None,
+             cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[Any, Dict]:
+    """Filter, project and page a list payload from the gateway.
+
+    Returns (items, meta) where meta carries the filtered total, the next-page
+    cursor (None on the last page) and the serialized size of the page. The
+    payload itself is never mutated, so cached responses can be passed in.
+    """
+    items = items_of(payload)
+    if items is None:
+        return payload, {"bytes": len(json.dumps(payload, separators=(",", ":"), default=str))}
+
+    if date_from or date_to:
+        items = [
+            item for item in items
+            if isinstance(item, dict) and (date := item_date(item)) is not None
+            and (not date_from or date >= date_from) and (not date_to or date <= date_to)
+        ]
+
+    offset = int(cursor) if cursor else 0
+    limit = int(limit) if limit else DEFAULT_PAGE_SIZE
+    page = items[offset:offset + limit]
+
+    fields = parse_fields(fields)
+    if fields:
+        page = [{k: item[k] for k in fields if k in item} if isinstance(item, dict) else item for item in page]
+
+    next_offset = offset + len(page)
+    meta = {
+        "total": len(items),
+        "returned": len(page),
+        "next_cursor": str(next_offset) if next_offset < len(items) else None,
+        "bytes": len(json.dumps(page, separators=(",", ":"), default=str)),
+    }
+    return page, meta
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+from projection import item_date
+
+INDEX_DIR = os.getenv("MCP_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".records_index"))
+CHUNK_WORDS = int(os.getenv("MCP_INDEX_CHUNK_WORDS", "80"))
+CHUNK_OVERLAP = 20
+MAX_PATIENTS_IN_MEMORY = 256
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "has", "have",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "was", "what", "when",
+    "which", "who", "with", "you", "your",
+}
+# Fields that carry no searchable text
+SKIPPED_FIELDS = {"id", "patientId", "patient_id", "booked_test_id", "bookedTestId", "file_url", "fileUrl"}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS]
+
+
+def record_id_of(record: Dict) -> str:
+    if record.get("id") is not None:
+        return str(record["id"])
+    return hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def record_text(record: Dict) -> str:
+    parts = []
+    for key, value in record.items():
+        if key in SKIPPED_FIELDS or not isinstance(value, (str, int, float)):
+            continue
+        value = str(value)
+        if value.startswith("http"):
+            continue
+        parts.append(f"{key.replace('_', ' ')}: {value}")
+    return "\n".join(parts)
+
+
+def chunk_words(text: str) -> List[str]:
+    words = text.split()
+    if len(words) <= CHUNK_WORDS:
+        return [" ".join(words)] if words else []
+    step = CHUNK_WORDS - CHUNK_OVERLAP
+    return [" ".join(words[i:i + CHUNK_WORDS]) for i in range(0, len(words) - CHUNK_OVERLAP, step)]
+
+
+class PatientIndex:
+    """BM25 index over one patient's chunked medical records, updated record by record."""
+
+    def __init__(self):
+        self.record_hashes: Dict[str, str] = {}
+        self.chunks: Dict[str, Dict] = {}  # "<record_id>:<n>" -> chunk with term frequencies
+        self.df: Counter = Counter()
+        self.postings: Dict[str, set] = {}
+        self.total_length = 0
+
+    def add_record(self, record_id: str, record: Dict, content_hash: str):
+        title = record.get("title") or record.get("record_type") or record.get("recordType")
+        for n, text in enumerate(chunk_words(record_text(record))):
+            tf = Counter(tokenize(text))
+            self._add_chunk(f"{record_id}:{n}", {
+                "record_id": record_id,
+                "title": title,
+                "date": item_date(record),
+                "text": text,
+                "tf": dict(tf),
+                "length": sum(tf.values()),
+            })
+        self.record_hashes[record_id] = content_hash
+
+    def remove_record(self, record_id: str):
+        for chunk_id in [c for c, chunk in self.chunks.items() if chunk["record_id"] == record_id]:
+            chunk = self.chunks.pop(chunk_id)
+            self.total_length -= chunk["length"]
+            for term in chunk["tf"]:
+                self.df[term] -= 1
+                self.postings[term].discard(chunk_id)
+                if not self.df[term]:
+                    del self.df[term]
+                    del self.postings[term]
+        self.record_hashes.pop(record_id, None)
+
+    def _add_chunk(self, chunk_id: str, chunk: Dict):
+        self.chunks[chunk_id] = chunk
+        self.total_length += chunk["length"]
+        for term in chunk["tf"]:
+            self.df[term] += 1
+            self.postings.setdefault(term, set()).add(chunk_id)
+
+    def search(self, query: str) -> List[Dict]:
+        if not self.chunks:
+            return []
+        n = len(self.chunks)
+        avg_length = self.total_length / n or 1
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            if term not in self.df:
+                continue
+            idf = math.log(1 + (n - self.df[term] + 0.5) / (self.df[term] + 0.5))
+            for chunk_id in self.postings[term]:
+                chunk = self.chunks[chunk_id]
+                tf = chunk["tf"][term]
+                norm = tf + K1 * (1 - B + B * chunk["length"] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (K1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [
+            {
+                "record_id": self.chunks[chunk_id]["record_id"],
+                "chunk": chunk_id,
+                "score": round(score, 4),
+                "date": self.chunks[chunk_id]["date"],
+                "title": self.chunks[chunk_id]["title"],
+                "text": self.chunks[chunk_id]["text"],
+            }
+            for chunk_id, score in ranked
+        ]
+
+    def to_dict(self) -> Dict:
+        return {"record_hashes": self.record_hashes, "chunks": self.chunks}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PatientIndex":
+        index = cls()
+        index.record_hashes = data.get("record_hashes", {})
+        for chunk_id, chunk in data.get("chunks", {}).items():
+            index._add_chunk(chunk_id, chunk)
+        return index
+
+
+class RecordsIndex:
+    """Per-patient retrieval indexes over medical records, cached in memory and on disk.
+
+    sync() only re-chunks records whose content changed since the last call, so
+    a patient's index is rebuilt incrementally as new records appear. Everything
+    runs locally; no model or network access is needed.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self._indexes: "OrderedDict[str, PatientIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, patient_id: str) -> str:
+        return os.path.join(self.index_dir, f"{hashlib.sha1(str(patient_id).encode()).hexdigest()}.json")
+
+    def _load(self, patient_id: str) -> PatientIndex:
+        index = self._indexes.get(patient_id)
+        if index is not None:
+            self._indexes.move_to_end(patient_id)
+            return index
+
+        index = PatientIndex()
+        try:
+            with open(self._path(patient_id), encoding="utf-8") as f:
+                index = PatientIndex.from_dict(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            # A corrupt index file is rebuilt from the records on this sync
+            logging.warning(f"Discarding unreadable records index for patient {patient_id}: {e}")
+
+        self._indexes[patient_id] = index
+        while len(self._indexes) > MAX_PATIENTS_IN_MEMORY:
+            self._indexes.popitem(last=False)
+        return index
+
+    def _save(self, patient_id: str, index: PatientIndex):
+        os.makedirs(self.index_dir, exist_ok=True)
+        path = self._path(patient_id)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def sync(self, patient_id: str, records: List[Dict]) -> Dict:
+        """Bring the patient's index in line with `records`; returns what changed."""
+        with self._lock:
+            index = self._load(patient_id)
+            seen = set()
+            added = updated = 0
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                record_id = record_id_of(record)
+                seen.add(record_id)
+                content_hash = hashlib.sha1(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+                previous = index.record_hashes.get(record_id)
+                if previous == content_hash:
+                    continue
+                if previous is not None:
+                    index.remove_record(record_id)
+                    updated += 1
+                else:
+                    added += 1
+                index.add_record(record_id, record, content_hash)
+
+            removed = [record_id for record_id in index.record_hashes if record_id not in seen]
+            for record_id in removed:
+                index.remove_record(record_id)
+
+            if added or updated or removed:
+                self._save(patient_id, index)
+            return {"added": added, "updated": updated, "removed": len(removed), "chunks": len(index.chunks)}
+
+    def search(self, patient_id: str, question: str, limit: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            hits = self._load(patient_id).search(question)
+        return hits[:limit] if limit else hits
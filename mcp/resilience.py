@@ -0,0 +1,181 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional
+
+import requests
+
+# Statuses worth another attempt; anything else is returned to the caller as-is
+RETRYABLE_STATUS = {502, 503, 504}
+
+# Writes that are safe to repeat: cancelling or setting absolute values twice has
+# the same effect as once. POSTs (book_appointment, book_lab_test) are never retried.
+IDEMPOTENT_WRITES = {
+    ("DELETE", "/appointments/{appointment_id}"),
+    ("PATCH", "/appointments/{appointment_id}"),
+    ("PATCH", "/booked-lab-tests/{test_id}/cancel"),
+}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("gateway_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Give every gateway call made inside the block a shared absolute deadline."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """Per-route breaker: opens after consecutive failures, lets one trial through after reset_timeout."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "closed":
+                return True
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_started = now
+                return True
+            # Half-open: only one trial at a time, unless the last one went missing
+            if self.state == "half_open" and now - self._trial_started >= self.reset_timeout:
+                self._trial_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class Resilience:
+    """Retries with jittered backoff, circuit breaking and deadline checks around gateway calls."""
+
+    def __init__(
+        self,
+        max_attempts: int = int(os.getenv("GATEWAY_MAX_ATTEMPTS", "3")),
+        base_delay: float = float(os.getenv("GATEWAY_RETRY_BASE_DELAY", "0.1")),
+        max_delay: float = float(os.getenv("GATEWAY_RETRY_MAX_DELAY", "2")),
+        failure_threshold: int = int(os.getenv("GATEWAY_BREAKER_THRESHOLD", "5")),
+        reset_timeout: float = float(os.getenv("GATEWAY_BREAKER_RESET", "30")),
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retries: Dict[str, int] = {}
+        self.short_circuited: Dict[str, int] = {}
+        self.deadline_exceeded = 0
+        self._lock = threading.Lock()
+
+    def breaker(self, route: str) -> CircuitBreaker:
+        with self._lock:
+            if route not in self.breakers:
+                self.breakers[route] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[route]
+
+    def is_retryable(self, method: str, route: str) -> bool:
+        return method == "GET" or (method, route) in IDEMPOTENT_WRITES
+
+    def backoff(self, attempt: int) -> float:
+        # "Full jitter": uniform in [0, capped exponential]
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _count(self, counter: Dict[str, int], route: str):
+        with self._lock:
+            counter[route] = counter.get(route, 0) + 1
+
+    async def call(self, method: str, route: str,
+                   send: Callable[[Optional[float]], Awaitable[requests.Response]]) -> requests.Response:
+        """Call send(time_left) until it succeeds, retries run out or the deadline passes."""
+        breaker = self.breaker(route)
+        attempt = 0
+        while True:
+            left = time_left()
+            if left is not None and left <= 0:
+                self.deadline_exceeded += 1
+                raise DeadlineExceeded(f"Deadline exceeded before calling {method} {route}")
+            if not breaker.allow():
+                self._count(self.short_circuited, route)
+                raise CircuitOpenError(f"Circuit open for {route}; failing fast")
+
+            error, response = None, None
+            try:
+                response = await send(left)
+            except requests.RequestException as e:
+                error = e
+                breaker.record_failure()
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response
+
+            attempt += 1
+            delay = self.backoff(attempt)
+            left = time_left()
+            if (attempt >= self.max_attempts or not self.is_retryable(method, route)
+                    or (left is not None and delay >= left)):
+                if response is not None:
+                    return response
+                raise error
+
+            self._count(self.retries, route)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "retries": dict(self.retries),
+                "short_circuited": dict(self.short_circuited),
+                "deadline_exceeded": self.deadline_exceeded,
+                "breakers": {
+                    route: {"state": b.state, "consecutive_failures": b.failures, "trips": b.trips}
+                    for route, b in self.breakers.items()
+                },
+            }
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Seconds an entry stays fresh, per resource type
+DEFAULT_TTLS: Dict[str, float] = {
+    "doctors": float(os.getenv("CACHE_TTL_DOCTORS", "300")),
+    "appointments": float(os.getenv("CACHE_TTL_APPOINTMENTS", "30")),
+    "medical_records": float(os.getenv("CACHE_TTL_MEDICAL_RECORDS", "60")),
+}
+
+
+class ResponseCache:
+    """Bounded in-process cache with a TTL per resource type and LRU eviction.
+
+    Entries are keyed by (kind, key), e.g. ("appointments", patient_id). Cached
+    values are shared between callers and must be treated as read-only.
+
+    A caller that fetches and then fills an entry should take generation()
+    before fetching and pass it to set(): if the entry was invalidated in the
+    meantime, the fetched value may predate the write and is not stored.
+    """
+
+    def __init__(self, maxsize: int = int(os.getenv("CACHE_MAXSIZE", "1024")),
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # (kind, key) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._evictions = 0
+        self._invalidations = 0
+        self._generations: "OrderedDict[tuple, int]" = OrderedDict()  # (kind, key) -> invalidations
+        self._kind_generations: Dict[str, int] = {}
+
+    def get(self, kind: str, key: Hashable = None) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((kind, key))
+                self._hits[kind] = self._hits.get(kind, 0) + 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[(kind, key)]
+            self._misses[kind] = self._misses.get(kind, 0) + 1
+            return None
+
+    def generation(self, kind: str, key: Hashable = None) -> Tuple[int, int]:
+        with self._lock:
+            return self._kind_generations.get(kind, 0), self._generations.get((kind, key), 0)
+
+    def set(self, kind: str, key: Hashable, value: Any, generation: Optional[Tuple[int, int]] = None):
+        expires_at = time.monotonic() + self.ttls.get(kind, self.default_ttl)
+        with self._lock:
+            current = (self._kind_generations.get(kind, 0), self._generations.get((kind, key), 0))
+            if generation is not None and generation != current:
+                return
+            self._entries[(kind, key)] = (expires_at, value)
+            self._entries.move_to_end((kind, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, kind: str, key: Hashable = None, all_keys: bool = False):
+        """Drop one entry, or every entry of `kind` when all_keys is set."""
+        with self._lock:
+            if all_keys:
+                stale = [k for k in self._entries if k[0] == kind]
+                self._kind_generations[kind] = self._kind_generations.get(kind, 0) + 1
+            else:
+                stale = [(kind, key)] if (kind, key) in self._entries else []
+                self._generations[(kind, key)] = self._generations.get((kind, key), 0) + 1
+                self._generations.move_to_end((kind, key))
+                while len(self._generations) > self.maxsize:
+                    # Forgetting a count could let a stale fill through; bump the whole kind instead
+                    forgotten, _ = self._generations.popitem(last=False)
+                    self._kind_generations[forgotten[0]] = self._kind_generations.get(forgotten[0], 0) + 1
+            for k in stale:
+                del self._entries[k]
+            self._invalidations += len(stale)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": sum(self._hits.values()),
+                "misses": sum(self._misses.values()),
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "by_kind": {
+                    kind: {"hits": self._hits.get(kind, 0), "misses": self._misses.get(kind, 0), "ttl": self.ttls.get(kind, self.default_ttl)}
+                    for kind in sorted(set(self._hits) | set(self._misses) | set(self.ttls))
+                },
+            }
@@ -0,0 +1,159 @@
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.message import SessionMessage
+from mcp.types import Implementation, InitializeResult, JSONRPCMessage
+
+POOL_SIZE = int(os.getenv("MCP_SESSION_POOL_SIZE", "1"))
+
+
+@asynccontextmanager
+async def unix_socket_transport(path: str):
+    """Newline-delimited JSON-RPC over a Unix socket, as served by warm_pool.py."""
+    stream = await anyio.connect_unix(path)
+    read_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_reader = anyio.create_memory_object_stream(0)
+
+    async def reader():
+        buffer = b""
+        async with read_writer:
+            try:
+                while True:
+                    chunk = await stream.receive()
+                    lines = (buffer + chunk).split(b"\n")
+                    buffer = lines.pop()
+                    for line in lines:
+                        try:
+                            await read_writer.send(SessionMessage(JSONRPCMessage.model_validate_json(line)))
+                        except ValueError as exc:
+                            await read_writer.send(exc)
+            except (anyio.EndOfStream, anyio.ClosedResourceError, anyio.BrokenResourceError):
+                pass
+
+    async def writer():
+        async with write_reader:
+            async for message in write_reader:
+                data = message.message.model_dump_json(by_alias=True, exclude_none=True)
+                await stream.send((data + "\n").encode())
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(reader)
+        tg.start_soon(writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            await stream.aclose()
+            tg.cancel_scope.cancel()
+
+
+@asynccontextmanager
+async def memory_transport(server):
+    """Run an in-process FastMCP server over memory streams (used by the benchmarks)."""
+    from mcp.shared.memory import create_client_server_memory_streams
+
+    lowlevel = getattr(server, "_mcp_server", server)
+    async with create_client_server_memory_streams() as (client_streams, server_streams):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(lambda: lowlevel.run(*server_streams, lowlevel.create_initialization_options()))
+            try:
+                yield client_streams
+            finally:
+                tg.cancel_scope.cancel()
+
+
+def server_label(server: Union[str, Any]) -> str:
+    return server if isinstance(server, str) else f"memory:{getattr(server, 'name', type(server).__name__)}"
+
+
+async def open_session(exit_stack: AsyncExitStack, server: Union[str, Any]) -> Tuple[ClientSession, InitializeResult]:
+    """Connect to a running server by URL (http://host:4007/mcp, .../sse or unix:///path.sock),
+    spawn a script over stdio, or connect to an in-process server object over memory streams."""
+    # Transports are imported on first use so start-up only pays for the one in use
+    if not isinstance(server, str):
+        read, write = await exit_stack.enter_async_context(memory_transport(server))
+    elif server.startswith("unix://"):
+        read, write = await exit_stack.enter_async_context(unix_socket_transport(server[len("unix://"):]))
+    elif server.startswith(("http://", "https://")):
+        if server.rstrip("/").endswith("/sse"):
+            from mcp.client.sse import sse_client
+
+            read, write = await exit_stack.enter_async_context(sse_client(server))
+        else:
+            from mcp.client.streamable_http import streamable_http_client
+
+            read, write, _ = await exit_stack.enter_async_context(streamable_http_client(server))
+    else:
+        is_python = server.endswith(".py")
+        is_js = server.endswith(".js")
+        if not (is_python or is_js):
+            raise ValueError("Server script must be a .py or .js file")
+
+        command = "python" if is_python else "node"
+        server_params = StdioServerParameters(command=command, args=[server], env=None)
+        read, write = await exit_stack.enter_async_context(stdio_client(server_params))
+
+    session = await exit_stack.enter_async_context(ClientSession(read, write))
+    return session, await session.initialize()
+
+
+class SessionPool:
+    """A fixed set of initialized MCP sessions shared by every chat of the client.
+
+    A ClientSession multiplexes concurrent requests, so sessions are leased
+    rather than checked out: each call goes to the session with the fewest
+    requests in flight. Over stdio every session is its own server process.
+    """
+
+    def __init__(self, server: Union[str, Any], size: int = POOL_SIZE):
+        self.server = server
+        self.size = max(1, size)
+        self.sessions: List[ClientSession] = []
+        self.server_info: Optional[Implementation] = None  # name/version from initialize
+        self._in_flight: Dict[int, int] = {}
+        self._calls: Dict[int, int] = {}
+        self._exit_stack = AsyncExitStack()
+
+    async def start(self):
+        # Sessions are opened one after another: the exit stack must unwind in order
+        for _ in range(self.size):
+            session, init = await open_session(self._exit_stack, self.server)
+            self.server_info = init.serverInfo
+            self.sessions.append(session)
+            self._in_flight[id(session)] = 0
+            self._calls[id(session)] = 0
+
+    @asynccontextmanager
+    async def lease(self):
+        if not self.sessions:
+            raise RuntimeError("Not connected to server")
+        session = min(self.sessions, key=lambda s: self._in_flight[id(s)])
+        self._in_flight[id(session)] += 1
+        self._calls[id(session)] += 1
+        try:
+            yield session
+        finally:
+            self._in_flight[id(session)] -= 1
+
+    async def call_tool(self, name: str, arguments: Dict, meta: Optional[Dict] = None):
+        async with self.lease() as session:
+            return await session.call_tool(name, arguments, meta=meta)
+
+    async def read_resource(self, uri: str):
+        async with self.lease() as session:
+            return await session.read_resource(uri)
+
+    def stats(self) -> Dict:
+        return {
+            "server": server_label(self.server),
+            "sessions": len(self.sessions),
+            "in_flight": [self._in_flight[id(s)] for s in self.sessions],
+            "calls": [self._calls[id(s)] for s in self.sessions],
+        }
+
+    async def close(self):
+        await self._exit_stack.aclose()
+        self.sessions = []
@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from benchmarks.stub_gateway import StubGateway
+
+
+@pytest.fixture(scope="session")
+def stub():
+    os.environ["MCP_TRACE_FILE"] = ""
+    os.environ["MCP_PREFETCH"] = "0"  # only the calls themselves reach the gateway
+    with StubGateway() as stub:
+        os.environ["API_GATEWAY_URL"] = stub.base_url  # read when mcp_server is imported
+        yield stub
+
+
+@pytest.fixture
+def server(stub):
+    import mcp_server
+
+    mcp_server.idempotency.clear()
+    mcp_server.admission.clear()
+    return mcp_server
@@ -0,0 +1,26 @@
+"""Batch tools report every item, however long the whole batch takes.
+
+Run with `pytest` from mcp/, or `pytest mcp/tests` from the repository root.
+"""
+import asyncio
+import json
+
+
+def test_batch_longer_than_tool_deadline_reports_every_item(server, stub, monkeypatch):
+    # 24 cancellations, 8 at a time, take three round trips: longer than the deadline
+    monkeypatch.setattr(server, "TOOL_DEADLINE", 0.5)
+    monkeypatch.setattr(stub, "latency", 0.2)
+    ids = [f"apt-{i}" for i in range(24)]
+    result = asyncio.run(server.mcp.call_tool("batch_cancel_appointments", {"appointment_ids": ids}))
+    body = json.loads(result[0].text)
+    assert [entry["item"] for entry in body["results"]] == ids
+    assert body["succeeded"] == 24
+
+
+def test_item_over_its_deadline_fails_alone(server, stub, monkeypatch):
+    monkeypatch.setattr(server, "TOOL_DEADLINE", 0.3)
+    monkeypatch.setattr(stub, "route_latency", {r"/appointments/slow": 1.0})
+    result = asyncio.run(server.mcp.call_tool("batch_cancel_appointments", {"appointment_ids": ["slow", "fast"]}))
+    body = json.loads(result[0].text)
+    assert [entry["success"] for entry in body["results"]] == [False, True]
+    assert body["failed"] == 1
@@ -0,0 +1,47 @@
+"""Derived idempotency keys suppress only true duplicates of a write.
+
+Run with `pytest` from mcp/, or `pytest mcp/tests` from the repository root.
+"""
+import asyncio
+import json
+
+
+def call(server, tool, **arguments):
+    result = asyncio.run(server.mcp.call_tool(tool, arguments))
+    return json.loads(result[0].text)
+
+
+def test_repeat_is_replayed(server, stub):
+    first = call(server, "reschedule_appointment", appointment_id="a1", new_date="2025-05-01", new_time="10:00")
+    before = stub.requests
+    second = call(server, "reschedule_appointment", appointment_id="a1", new_date="2025-05-01", new_time="10:00")
+    assert stub.requests == before
+    assert second.get("replayed") and second["data"] == first["data"]
+
+
+def test_reschedule_back_to_earlier_date_reaches_gateway(server, stub):
+    call(server, "reschedule_appointment", appointment_id="a1", new_date="2025-05-01", new_time="10:00")
+    call(server, "reschedule_appointment", appointment_id="a1", new_date="2025-06-01", new_time="10:00")
+    before = stub.requests
+    result = call(server, "reschedule_appointment", appointment_id="a1", new_date="2025-05-01", new_time="10:00")
+    assert stub.requests == before + 1
+    assert result["success"] and not result.get("replayed")
+
+
+def test_book_again_after_cancel_creates_new_appointment(server, stub):
+    booking = {"patient_id": "p1", "doctor_id": "doc-1", "date": "2025-03-02", "time": "10:00"}
+    booked = call(server, "book_appointment", **booking)
+    call(server, "cancel_appointment", appointment_id=booked["data"]["id"])
+    before = stub.requests
+    result = call(server, "book_appointment", **booking)
+    assert stub.requests == before + 1
+    assert result["success"] and not result.get("replayed")
+
+
+def test_book_lab_test_again_after_cancel(server, stub):
+    booked = call(server, "book_lab_test", patient_id="p1", test_name="test-1", date="2025-03-02")
+    call(server, "cancel_lab_test", test_id=booked["data"]["id"])
+    before = stub.requests
+    result = call(server, "book_lab_test", patient_id="p1", test_name="test-1", date="2025-03-02")
+    assert stub.requests == before + 1
+    assert not result.get("replayed")
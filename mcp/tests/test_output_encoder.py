@@ -0,0 +1,54 @@
+"""The output cap keeps pagination metadata in step with the items it keeps.
+
+Run with `pytest` from mcp/, or `pytest mcp/tests` from the repository root.
+"""
+import json
+
+from output_encoder import OutputEncoder
+from projection import paginate
+
+
+def records(n):
+    return [{"id": f"rec-{i}", "date": "2024-01-01", "notes": "Routine checkup. " * 20} for i in range(n)]
+
+
+def test_capped_page_moves_cursor_to_first_dropped_item():
+    page, meta = paginate(records(50), limit=20)
+    text, capped = OutputEncoder().encode({"success": True, "medical_records": page, **meta}, 6000)
+    result = json.loads(text)
+    kept = [item for item in result["medical_records"] if isinstance(item, dict)]
+    assert capped and len(kept) < 20
+    assert result["returned"] == len(kept)
+    assert result["next_cursor"] == str(len(kept))
+
+
+def test_capped_last_page_gets_a_cursor():
+    page, meta = paginate(records(50), cursor="30", limit=20)
+    assert meta["next_cursor"] is None
+    result = json.loads(OutputEncoder().encode({"medical_records": page, **meta}, 6000)[0])
+    assert result["next_cursor"] == str(30 + result["returned"])
+
+
+def test_uncapped_page_is_unchanged():
+    page, meta = paginate(records(3), limit=20)
+    result = json.loads(OutputEncoder().encode({"medical_records": page, **meta}, 6000)[0])
+    assert result["returned"] == 3 and result["next_cursor"] is None
+
+
+def batch(entries):
+    return {"success": True, "total": len(entries), "succeeded": len(entries), "failed": 0, "results": entries}
+
+
+def test_capped_batch_keeps_every_item():
+    entries = [{"item": f"apt-{i}", "success": True, "message": "Appointment cancelled successfully"} for i in range(100)]
+    result = json.loads(OutputEncoder().encode(batch(entries), 6000)[0])
+    assert [entry["item"] for entry in result["results"]] == [f"apt-{i}" for i in range(100)]
+    assert all(entry["success"] for entry in result["results"])
+
+
+def test_capped_batch_shortens_payloads_before_dropping_them():
+    entries = [{"item": f"p{i}", "success": True, "appointments": records(3)} for i in range(8)]
+    text, capped = OutputEncoder().encode(batch(entries), 6000)
+    result = json.loads(text)
+    assert capped and len(result["results"]) == 8
+    assert all(isinstance(entry["appointments"][0], dict) for entry in result["results"])
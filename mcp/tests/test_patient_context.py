@@ -0,0 +1,84 @@
+"""A refresh that races a write is never served as fresh.
+
+Run with `pytest` from mcp/, or `pytest mcp/tests` from the repository root.
+"""
+import asyncio
+
+from patient_context import PatientContextStore
+from response_cache import ResponseCache
+
+
+class Response:
+    status_code = 200
+    headers = {}
+    text = ""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class SlowGateway:
+    """Answers GETs with the current appointments, but only once `release` is set."""
+
+    def __init__(self):
+        self.appointments = []
+        self.release = asyncio.Event()
+        self.sent = asyncio.Event()
+        self.requests = 0
+
+    async def aget(self, route, path_params=None, params=None, headers=None):
+        self.requests += 1
+        answer = list(self.appointments)  # read before the write commits
+        self.sent.set()
+        await self.release.wait()
+        return Response(answer)
+
+
+def test_refresh_in_flight_during_write_is_not_served_as_fresh():
+    async def scenario():
+        gateway = SlowGateway()
+        store = PatientContextStore(gateway)
+        stale_read = asyncio.ensure_future(store.read("p1", "appointments"))
+        await gateway.sent.wait()
+
+        gateway.appointments.append({"id": "apt-new"})  # the write commits...
+        store.mark_stale("appointments", "p1")  # ...and invalidates while the GET is out
+        gateway.release.set()
+
+        assert await stale_read == (200, [])
+        assert await store.read("p1", "appointments") == (200, [{"id": "apt-new"}])
+        assert gateway.requests == 2
+
+    asyncio.run(scenario())
+
+
+def test_read_after_write_does_not_join_older_refresh():
+    async def scenario():
+        gateway = SlowGateway()
+        store = PatientContextStore(gateway)
+        stale_read = asyncio.ensure_future(store.read("p1", "appointments"))
+        await gateway.sent.wait()
+
+        gateway.appointments.append({"id": "apt-new"})
+        store.mark_stale("appointments", "p1")
+        fresh_read = asyncio.ensure_future(store.read("p1", "appointments"))
+        gateway.release.set()
+
+        assert await stale_read == (200, [])
+        assert await fresh_read == (200, [{"id": "apt-new"}])
+
+    asyncio.run(scenario())
+
+
+def test_cache_fill_after_invalidate_is_dropped():
+    cache = ResponseCache()
+    generation = cache.generation("appointments", "p1")
+    cache.invalidate("appointments", "p1")
+    cache.set("appointments", "p1", [], generation)
+    assert cache.get("appointments", "p1") is None
+
+    cache.set("appointments", "p1", [{"id": "apt-new"}], cache.generation("appointments", "p1"))
+    assert cache.get("appointments", "p1") == [{"id": "apt-new"}]
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Optional
+
+from records_index import tokenize
+
+CATALOG_DIR = os.getenv("MCP_CATALOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".catalog_cache"))
+# Servers that don't version their catalog can change it silently, so entries also expire
+CATALOG_TTL = float(os.getenv("MCP_CATALOG_TTL", "86400"))
+# Tool schemas sent with each query; 0 sends every tool
+TOOL_TOP_K = int(os.getenv("MCP_TOOL_TOP_K", "0"))
+
+
+def catalog_key(server: str, server_info) -> str:
+    """Key of a server's catalog: its address plus the name/version it reports on initialize."""
+    name = getattr(server_info, "name", "")
+    version = getattr(server_info, "version", "")
+    return hashlib.sha1(f"{server}|{name}|{version}".encode()).hexdigest()
+
+
+def load_catalog(key: str, catalog_dir: str = CATALOG_DIR) -> Optional[Dict]:
+    path = os.path.join(catalog_dir, f"{key}.json")
+    try:
+        if time.time() - os.path.getmtime(path) > CATALOG_TTL:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable tool catalog {path}: {e}")
+        return None
+
+
+def save_catalog(key: str, catalog: Dict, catalog_dir: str = CATALOG_DIR):
+    try:
+        os.makedirs(catalog_dir, exist_ok=True)
+        path = os.path.join(catalog_dir, f"{key}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(catalog, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logging.warning(f"Could not cache tool catalog: {e}")
+
+
+def _stem(term: str) -> str:
+    # Just enough for "appointments"/"appointment", "cancelled"/"cancel" and
+    # "rescheduling"/"reschedule" to meet
+    for suffix in ("ing", "ed", "es", "s"):
+        if term.endswith(suffix) and len(term) - len(suffix) >= 4:
+            term = term[: -len(suffix)]
+            break
+    if len(term) > 4 and term[-1] == term[-2]:
+        term = term[:-1]
+    if len(term) > 4 and term.endswith("e"):
+        term = term[:-1]
+    return term
+
+
+def _terms(text: str) -> List[str]:
+    return [_stem(t) for t in tokenize(text.replace("_", " "))]
+
+
+def _tool_text(tool: Dict) -> str:
+    function = tool["function"]
+    parameters = function.get("parameters", {}).get("properties", {})
+    parts = [function["name"], function.get("description") or ""]
+    for name, schema in parameters.items():
+        parts.append(name)
+        parts.append(schema.get("description", "") if isinstance(schema, dict) else "")
+    return " ".join(parts)
+
+
+class ToolSelector:
+    """Picks the tool schemas relevant to a query by term overlap with each tool's name, description and parameters.
+
+    Per-tool terms, IDF weights and serialized sizes are computed once when the
+    catalog loads. When nothing in the query matches any tool, every tool is
+    sent rather than guessing.
+    """
+
+    def __init__(self, tools: List[Dict], top_k: int = TOOL_TOP_K):
+        self.tools = tools
+        self.top_k = top_k
+        self.sizes = [len(json.dumps(tool, separators=(",", ":"))) for tool in tools]
+        self.total_bytes = sum(self.sizes)
+        self._terms = [set(_terms(_tool_text(tool))) for tool in tools]
+        n = len(tools)
+        df: Dict[str, int] = {}
+        for terms in self._terms:
+            for term in terms:
+                df[term] = df.get(term, 0) + 1
+        self._idf = {term: math.log(1 + n / count) for term, count in df.items()}
+        self.bytes_sent = 0
+        self.bytes_full = 0
+
+    def select(self, query: str) -> List[Dict]:
+        if not self.top_k or self.top_k >= len(self.tools):
+            chosen = list(range(len(self.tools)))
+        else:
+            query_terms = set(_terms(query))
+            scores = [
+                (sum(self._idf[t] for t in query_terms & terms), i)
+                for i, terms in enumerate(self._terms)
+            ]
+            ranked = sorted((s for s in scores if s[0] > 0), key=lambda s: (-s[0], s[1]))
+            chosen = sorted(i for _, i in ranked[: self.top_k]) or list(range(len(self.tools)))
+
+        self.bytes_sent += sum(self.sizes[i] for i in chosen)
+        self.bytes_full += self.total_bytes
+        return [self.tools[i] for i in chosen]
+
+    def stats(self) -> Dict:
+        return {
+            "tools": len(self.tools),
+            "top_k": self.top_k,
+            "catalog_bytes": self.total_bytes,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_full - self.bytes_sent,
+        }
@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Opt-in: set to a path and spans of every process (client and server) are appended
+# to that one JSON-lines file, e.g. MCP_TRACE_FILE=traces.jsonl; unset, nothing is exported
+TRACE_FILE = os.getenv("MCP_TRACE_FILE", "")
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent span_id) from a W3C traceparent header, or None."""
+    match = TRACEPARENT_RE.match(header or "")
+    return (match.group(1), match.group(2)) if match else None
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.tracer.service,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class FileExporter:
+    """Appends finished spans as JSON lines; one write per span keeps lines intact across processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logging.warning(f"Could not export span {span.name} to {self.path}: {e}")
+
+
+class Tracer:
+    """Creates spans for one service and exports them when they end.
+
+    Without a trace file spans are still created, so trace context keeps
+    flowing to the processes downstream.
+    """
+
+    def __init__(self, service: str, path: Optional[str] = TRACE_FILE):
+        self.service = service
+        self.exporter = FileExporter(path) if path else None
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[str] = None, **attributes) -> Iterator[Span]:
+        """Start a span under `parent` (a traceparent header), else under the current span."""
+        remote = parse_traceparent(parent)
+        current = _current_span.get()
+        if remote:
+            trace_id, parent_id = remote
+        elif current is not None:
+            trace_id, parent_id = current.trace_id, current.span_id
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+
+        span = Span(self, name, trace_id, parent_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - span._start_perf
+            if self.exporter:
+                self.exporter.export(span)
+
+
+@contextmanager
+def child_span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """A span under the current one, exported by the same tracer; yields None outside a trace."""
+    current = _current_span.get()
+    if current is None:
+        yield None
+        return
+    with current.tracer.span(name, **attributes) as span:
+        yield span
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# ---------------- WATERFALL ----------------
+def load_spans(path: str = TRACE_FILE) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def waterfall(spans: List[Dict], trace_id: str, width: int = 40) -> str:
+    """Render one trace as an indented timeline, children under their parents."""
+    spans = sorted((s for s in spans if s["trace_id"] == trace_id), key=lambda s: s["start"])
+    if not spans:
+        return f"No spans for trace {trace_id}"
+    t0 = spans[0]["start"]
+    total = max(s["start"] + s["duration_ms"] / 1000 for s in spans) - t0 or 1e-9
+    ids = {s["span_id"] for s in spans}
+    children: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        children.setdefault(s["parent_id"] if s["parent_id"] in ids else None, []).append(s)
+
+    lines = [f"trace {trace_id}  {total * 1000:.1f} ms"]
+
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            offset = (s["start"] - t0) / total
+            length = max(1, round(s["duration_ms"] / 1000 / total * width))
+            bar = " " * round(offset * width) + "█" * length
+            label = f"{'  ' * depth}{s['name']} [{s['service']}]"
+            flag = " !" if s["status"] != "ok" else ""
+            lines.append(f"{label:<60} {bar:<{width + 1}} {s['duration_ms']:9.1f} ms{flag}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python tracing.py [trace_id]  -> waterfall of that trace, or of the latest one
+    if not TRACE_FILE:
+        sys.exit("Set MCP_TRACE_FILE to the trace file the client and server wrote")
+    all_spans = load_spans()
+    wanted = sys.argv[1] if len(sys.argv) > 1 else max(all_spans, key=lambda s: s["start"])["trace_id"]
+    print(waterfall(all_spans, wanted))
@@ -0,0 +1,96 @@
+"""Pre-forked pool of warm MCP server processes behind a Unix socket.
+
+The parent imports mcp_server once, then keeps `size` forked children waiting
+in accept() on a shared socket. A client that connects (MCPClient with
+"unix:///path/to.sock") gets a child that has already paid for interpreter
+start-up and imports, which then speaks the ordinary stdio protocol over the
+socket and exits when the session ends. The parent forks a replacement.
+
+    python warm_pool.py --size 4 --socket /tmp/hygieia-mcp.sock
+
+Requires os.fork, so Linux/macOS only.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+SOCKET_PATH = os.getenv("MCP_WARM_SOCKET", "/tmp/hygieia-mcp.sock")
+POOL_SIZE = int(os.getenv("MCP_WARM_POOL_SIZE", "4"))
+
+
+def serve_one(listener: socket.socket):
+    """Child: take one connection and serve a stdio MCP session over it."""
+    conn, _ = listener.accept()
+    listener.close()
+    os.dup2(conn.fileno(), 0)
+    os.dup2(conn.fileno(), 1)
+    conn.close()
+    # Re-open the std streams on the new descriptors
+    sys.stdin = os.fdopen(0, "r", closefd=False)
+    sys.stdout = os.fdopen(1, "w", closefd=False)
+
+    import mcp_server
+
+    try:
+        mcp_server.mcp.run(transport="stdio")
+    finally:
+        os._exit(0)
+
+
+def fork_child(listener: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            serve_one(listener)
+        except BaseException:
+            logging.exception("Warm MCP server process failed")
+        os._exit(1)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=POOL_SIZE)
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    import mcp_server  # noqa: F401  (imported once here, inherited by every child)
+
+    logging.info(f"mcp_server imported in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(args.socket)
+    listener.listen(128)
+
+    children = {fork_child(listener) for _ in range(args.size)}
+    logging.info(f"Warm pool of {args.size} MCP servers listening on {args.socket}")
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
+        os.unlink(args.socket)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while True:
+        pid, _ = os.wait()
+        children.discard(pid)
+        children.add(fork_child(listener))
+
+
+if __name__ == "__main__":
+    main()